@@ -0,0 +1,97 @@
+import hashlib
+import io
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pygame
+import constants as cons
+
+#folders (relative to the game) that assets are loaded from
+ASSET_DIRS = ("assets", "levels", "saves")
+SKIP_DIRS = {"__pycache__"}
+CACHE_HEADER = struct.Struct("<HH")     #width, height of the cached pixels
+
+#Class that indexes every asset file once so looking one up is a single dictionary access
+class AssetManifest():
+    def __init__(self, root = Path(__file__).parent, strict = cons.STRICT_ASSETS):
+        self.root = Path(root)
+        self.strict = strict        #raise straight away when an asset is missing instead of returning None
+        self.paths = {}             #"assets/images/..." style name -> path to open
+        self.scan()
+
+    def scan(self):
+        #walk only the asset folders, so whatever else is in the game folder doesn't slow startup
+        self.paths.clear()
+        for asset_dir in ASSET_DIRS:
+            for dir_path, dir_names, file_names in os.walk(self.root / asset_dir):
+                dir_names[:] = [name for name in dir_names if name not in SKIP_DIRS]
+                for file_name in file_names:
+                    path = Path(dir_path, file_name)
+                    self.paths[path.relative_to(self.root).as_posix()] = str(path)
+
+    def find(self, file_name, required = True):
+        path = self.paths.get(Path(file_name).as_posix())
+        if path == None and required and self.strict:
+            raise FileNotFoundError(f"asset {file_name} is missing from {self.root}")
+        return path
+
+#Class that keeps scaled images on disk as raw pixels so later launches skip decoding and scaling
+class SurfaceCache():
+    def __init__(self, cache_dir = Path(__file__).parent / cons.SURFACE_CACHE_DIR, pixel_format = "BGRA"):
+        #BGRA is the byte order of the usual 32 bit display format, so converting a cached image is a plain copy
+        self.cache_dir = Path(cache_dir)
+        self.pixel_format = pixel_format
+
+    def cache_path(self, source, scale):
+        #the key changes whenever the image file, the scale or the stored pixel format does
+        return self.cache_dir / f"{hashlib.sha1(source).hexdigest()}_{scale}_{self.pixel_format}.raw"
+
+    def load(self, path, scale):
+        #returns the scaled image, not yet converted to the display format
+        with open(path, "rb") as image_file:
+            source = image_file.read()
+        cache_path = self.cache_path(source, scale)
+        try:
+            with open(cache_path, "rb") as cache_file:
+                size = CACHE_HEADER.unpack(cache_file.read(CACHE_HEADER.size))
+                pixels = bytearray(size[0] * size[1] * len(self.pixel_format))
+                if cache_file.readinto(pixels) != len(pixels):
+                    raise ValueError(f"{cache_path} is truncated")
+            return pygame.image.frombuffer(pixels, size, self.pixel_format)
+        except (OSError, struct.error, ValueError):
+            #not cached yet (or the cached file is damaged), so build it
+            pass
+
+        image = pygame.image.load(io.BytesIO(source), str(path))
+        image = pygame.transform.scale(image, (image.get_width() * scale, image.get_height() * scale))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = cache_path.with_suffix(".tmp")
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(CACHE_HEADER.pack(*image.get_size()))
+                cache_file.write(pygame.image.tobytes(image, self.pixel_format))
+            os.replace(temp_path, cache_path)
+        except OSError:
+            #a read only install still works, it just never gets faster
+            pass
+        return image
+
+#Class that decodes and scales images on a thread pool (pygame lets go of the GIL while it does both)
+class ImageLoader():
+    def __init__(self, manifest, surface_cache, workers = None):
+        self.manifest = manifest
+        self.surface_cache = surface_cache
+        self.pool = ThreadPoolExecutor(workers)     #defaults to one worker per core (plus a few)
+
+    def decode(self, image):
+        file_name, scale = image
+        return self.surface_cache.load(self.manifest.find(file_name), scale)
+
+    def load_all(self, images, atlas = None):
+        #converting to the display format needs the display, so that part stays on the main thread
+        loaded = [image.convert_alpha() for image in self.pool.map(self.decode, images)]
+        if atlas != None:
+            #swap the images for their copies on the atlas, named by file
+            loaded = atlas.pack([(file_name, image) for (file_name, scale), image in zip(images, loaded)])
+        return loaded
\ No newline at end of file
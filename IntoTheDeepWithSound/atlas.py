@@ -0,0 +1,49 @@
+import pygame
+import constants as cons
+
+#Class that packs many small sprites into a few large surfaces (pages)
+class Atlas():
+    def __init__(self, page_size = cons.ATLAS_SIZE):
+        self.page_size = page_size
+        self.pages = []             #large surfaces holding the sprites
+        self.regions = {}           #sprite name -> (page number, rect of the sprite on that page)
+        self.shelf_x = 0            #where the next sprite goes on the current shelf
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def new_page(self):
+        page = pygame.Surface((self.page_size, self.page_size), pygame.SRCALPHA).convert_alpha()
+        page.fill((0, 0, 0, 0))
+        self.pages.append(page)
+        self.shelf_x = self.shelf_y = self.shelf_height = 0
+
+    def place(self, width, height):
+        #shelf packing: fill a row left to right, then start a new row under the tallest sprite in it
+        if width > self.page_size or height > self.page_size:
+            raise ValueError(f"a {width}x{height} sprite does not fit on a {self.page_size} atlas page")
+        if len(self.pages) == 0:
+            self.new_page()
+        if self.shelf_x + width > self.page_size:
+            self.shelf_y += self.shelf_height
+            self.shelf_x = self.shelf_height = 0
+        if self.shelf_y + height > self.page_size:
+            self.new_page()
+        rect = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return len(self.pages) - 1, rect
+
+    def pack(self, sprites):
+        #copy (name, image) pairs onto the pages and return the sprites as subsurfaces, in the same order
+        #placing the tallest first keeps the shelves tight
+        for name, image in sorted(sprites, key=lambda sprite: sprite[1].get_height(), reverse=True):
+            if name not in self.regions:
+                page, rect = self.place(*image.get_size())
+                #the page starts fully transparent, so taking the max copies the pixels exactly (alpha included)
+                self.pages[page].blit(image, rect, special_flags=pygame.BLEND_RGBA_MAX)
+                self.regions[name] = (page, rect)
+        return [self.sprite(name) for name, image in sprites]
+
+    def sprite(self, name):
+        page, rect = self.regions[name]
+        return self.pages[page].subsurface(rect)
@@ -0,0 +1,122 @@
+import random
+import pygame
+import numpy as np
+import constants as cons
+import weapon
+import grid
+
+#Class that keeps the AI state of every enemy in arrays so the whole group can be updated at once
+#(Character.ai does the same for one enemy at a time, the Character objects still handle moving and drawing)
+class EnemyStore():
+    def __init__(self, enemies):
+        self.enemies = enemies
+        count = len(enemies)
+        #centre of each enemy, kept up to date as they move
+        self.x = np.array([enemy.rect.centerx for enemy in enemies], dtype=np.int64)
+        self.y = np.array([enemy.rect.centery for enemy in enemies], dtype=np.int64)
+        #step taken towards the player last update
+        self.vx = np.zeros(count, dtype=np.int64)
+        self.vy = np.zeros(count, dtype=np.int64)
+        #timestamps (ms) and cooldowns
+        self.last_attack = np.array([enemy.last_attack for enemy in enemies], dtype=np.int64)
+        self.last_hit = np.array([enemy.last_hit for enemy in enemies], dtype=np.int64)
+        self.attack_cooldown = np.array([enemy.attack_cooldown for enemy in enemies], dtype=np.int64)
+        self.attack_damage = np.array([enemy.attack_damage for enemy in enemies], dtype=np.int64)
+        #flags
+        self.boss = np.array([enemy.boss for enemy in enemies], dtype=bool)
+        self.attacked = np.zeros(count, dtype=bool)
+        self.stunned = np.zeros(count, dtype=bool)
+        #line of sight to the player, only re-cast when the enemy or the player moves into a different cell
+        self.can_see = np.zeros(count, dtype=bool)
+        self.sight_x = np.full(count, -1, dtype=np.int64)
+        self.sight_y = np.full(count, -1, dtype=np.int64)
+        self.sight_player = None
+
+    def retire(self, keep):
+        #drop the enemies that are no longer updated (keep holds a bool for each enemy, in order)
+        self.enemies = [enemy for enemy, kept in zip(self.enemies, keep) if kept]
+        for name in ("x", "y", "vx", "vy", "last_attack", "last_hit", "attack_cooldown", "attack_damage",
+                     "boss", "attacked", "stunned", "can_see", "sight_x", "sight_y"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def update(self, player, wall_grid, flow_field, fireball_image, fireball_group):
+        now = pygame.time.get_ticks()
+        #only alive and hit can be changed from outside (by arrows)
+        alive = np.fromiter((enemy.alive for enemy in self.enemies), dtype=bool, count=len(self.enemies))
+        hit = np.fromiter((enemy.hit for enemy in self.enemies), dtype=bool, count=len(self.enemies))
+        if not alive.any():
+            return
+
+        #check if there is a wall between each enemy and the player (cells worked out as in grid.to_cell)
+        cell_x = (self.x + cons.TILE_SIZE // 2) // cons.TILE_SIZE
+        cell_y = (self.y + cons.TILE_SIZE // 2) // cons.TILE_SIZE
+        player_cell = grid.to_cell(player.rect.centerx, player.rect.centery)
+        recast = alive & ((cell_x != self.sight_x) | (cell_y != self.sight_y))
+        if player_cell != self.sight_player:
+            recast = alive.copy()
+            self.sight_player = player_cell
+        for i in np.flatnonzero(recast):
+            self.can_see[i] = wall_grid.line_of_sight((int(self.x[i]), int(self.y[i])), player.rect.center)
+        self.sight_x[recast] = cell_x[recast]
+        self.sight_y[recast] = cell_y[recast]
+
+        #distance to the player, and head straight at them if they can be seen
+        dx = player.rect.centerx - self.x
+        dy = player.rect.centery - self.y
+        dist = np.sqrt(dx * dx + dy * dy)
+        chase = (dist > cons.RANGE) & self.can_see
+        vx = np.where(chase, np.sign(dx) * cons.enemy_speed, 0)
+        vy = np.where(chase, np.sign(dy) * cons.enemy_speed, 0)
+
+        #the player is behind a wall so follow the shared flow field around it
+        for i in np.flatnonzero(alive & ~self.can_see):
+            next_cell = flow_field.next_cell((int(cell_x[i]), int(cell_y[i])))
+            if next_cell != None:
+                vx[i] = max(-cons.enemy_speed, min(cons.enemy_speed, next_cell[0] * cons.TILE_SIZE - int(self.x[i])))
+                vy[i] = max(-cons.enemy_speed, min(cons.enemy_speed, next_cell[1] * cons.TILE_SIZE - int(self.y[i])))
+
+        #move every enemy that isn't stunned (only the ones actually moving need the wall checks)
+        active = alive & ~self.stunned
+        moving = active & ((vx != 0) | (vy != 0))
+        for i in np.flatnonzero(active & ~moving):
+            self.enemies[i].isRunning = False
+        for i in np.flatnonzero(moving):
+            enemy = self.enemies[i]
+            enemy.move(int(vx[i]), int(vy[i]), wall_grid)
+            self.x[i], self.y[i] = enemy.rect.center
+
+        #attack the player if (in range, not behind a wall, attack_cooldown, and player hit cooldown)
+        #the first enemy to attack sets the player's hit cooldown, so only one can attack per update
+        can_attack = active & (dist < cons.ATTACK_RANGE) & ~self.attacked & self.can_see
+        if player.hit == False and can_attack.any():
+            i = np.flatnonzero(can_attack)[0]
+            player.health -= int(self.attack_damage[i]) + random.randint(-1,1)
+            player.hit = True
+            player.last_hit = now
+            self.attacked[i] = True
+            self.last_attack[i] = now
+
+        #make boss enemies shoot fireballs
+        can_shoot = active & self.boss & (dist < cons.fireball_range) & (dist > cons.fireball_min_range) & (now - self.last_attack > cons.fireball_cooldown) & self.can_see
+        for i in np.flatnonzero(can_shoot):
+            enemy = self.enemies[i]
+            fireball = weapon.fireball_pool.get(fireball_image, enemy.rect.centerx, enemy.rect.centery, player)
+            if fireball != None:
+                fireball_group.add(fireball)
+            self.last_attack[i] = now
+
+        #stun enemies that have been hit (bosses can't be stunned)
+        stun = alive & hit & ~self.boss
+        for i in np.flatnonzero(stun):
+            enemy = self.enemies[i]
+            enemy.hit = False
+            enemy.isRunning = False
+            enemy.update_action(0)
+        self.last_hit[stun] = now
+        self.stunned |= stun
+
+        #check the stun and attack cooldowns
+        self.stunned &= ~(alive & (now - self.last_hit > cons.stun_cooldown))
+        self.attacked &= ~(alive & (now - self.last_attack > self.attack_cooldown))
+        self.vx = vx
+        self.vy = vy
@@ -0,0 +1,143 @@
+import math
+from collections import deque
+import pygame
+import numpy as np
+import constants as cons
+
+#tiles are centred on their grid point, so a cell spans half a tile either side of it
+def to_cell(x, y):
+    return ((x + cons.TILE_SIZE // 2) // cons.TILE_SIZE, (y + cons.TILE_SIZE // 2) // cons.TILE_SIZE)
+
+def cell_range(rect):
+    #the first and last cell (inclusive) that a world-space rect overlaps
+    first = to_cell(rect.left, rect.top)
+    last = to_cell(rect.right - 1, rect.bottom - 1)
+    return first, last
+
+def cell_rect(cell):
+    #world-space rect covered by a cell
+    return pygame.Rect(cell[0] * cons.TILE_SIZE - cons.TILE_SIZE // 2, cell[1] * cons.TILE_SIZE - cons.TILE_SIZE // 2, cons.TILE_SIZE, cons.TILE_SIZE)
+
+def mask_cells(mask):
+    #(x, y) cells of every True entry in a [row][column] bool array
+    return {(int(x), int(y)) for y, x in np.argwhere(mask)}
+
+#Class that answers wall queries by tile cell
+class WallGrid():
+    def __init__(self, solid):
+        self.solid = solid                  #bool array of wall cells, [row][column]
+        self.cells = mask_cells(solid)      #the same cells as a set, for fast single lookups
+        self.padded = np.pad(solid, 1)      #with a border of open cells, so anything off the map can be looked up
+
+    def query(self, rect):
+        #rects of the walls in every cell the rect overlaps
+        found = []
+        first, last = cell_range(rect)
+        for cell_y in range(first[1], last[1] + 1):
+            for cell_x in range(first[0], last[0] + 1):
+                if (cell_x, cell_y) in self.cells:
+                    found.append(cell_rect((cell_x, cell_y)))
+        return found
+
+    def overlaps_walls(self, left, top, right, bottom):
+        #query() for many rects at once, given as arrays of their edges: whether each one overlaps a wall cell
+        #cells off the map all land on the open border of the padded grid
+        rows, columns = self.solid.shape
+        def padded_cell(values, limit):
+            return np.minimum(np.maximum((values + cons.TILE_SIZE // 2) // cons.TILE_SIZE, -1), limit) + 1
+        first_x = padded_cell(left, columns)
+        first_y = padded_cell(top, rows)
+        last_x = padded_cell(right - 1, columns)
+        last_y = padded_cell(bottom - 1, rows)
+        hit = np.zeros(len(left), dtype=bool)
+        if len(left) == 0:
+            return hit
+        #small rects only cover a cell or two, so step through the cells of all of them together
+        #(a rect that covers fewer cells just checks its last one again)
+        for step_y in range(int((last_y - first_y).max()) + 1):
+            cell_y = np.minimum(first_y + step_y, last_y)
+            for step_x in range(int((last_x - first_x).max()) + 1):
+                hit |= self.padded[cell_y, np.minimum(first_x + step_x, last_x)]
+        return hit
+
+    def line_of_sight(self, start, end):
+        #walk the cells the line passes through (DDA) and stop at the first wall
+        x0 = (start[0] + cons.TILE_SIZE // 2) / cons.TILE_SIZE
+        y0 = (start[1] + cons.TILE_SIZE // 2) / cons.TILE_SIZE
+        dx = (end[0] + cons.TILE_SIZE // 2) / cons.TILE_SIZE - x0
+        dy = (end[1] + cons.TILE_SIZE // 2) / cons.TILE_SIZE - y0
+        cell_x = math.floor(x0)
+        cell_y = math.floor(y0)
+
+        #how far along the line (0 to 1) the next cell border on each axis is, and the gap between borders
+        if dx > 0:
+            step_x = 1
+            t_delta_x = 1 / dx
+            t_max_x = (cell_x + 1 - x0) * t_delta_x
+        elif dx < 0:
+            step_x = -1
+            t_delta_x = -1 / dx
+            t_max_x = (x0 - cell_x) * t_delta_x
+        else:
+            step_x = 0
+            t_delta_x = t_max_x = math.inf
+        if dy > 0:
+            step_y = 1
+            t_delta_y = 1 / dy
+            t_max_y = (cell_y + 1 - y0) * t_delta_y
+        elif dy < 0:
+            step_y = -1
+            t_delta_y = -1 / dy
+            t_max_y = (y0 - cell_y) * t_delta_y
+        else:
+            step_y = 0
+            t_delta_y = t_max_y = math.inf
+
+        while (cell_x, cell_y) not in self.cells:
+            #reached the end of the line without hitting a wall
+            if t_max_x > 1 and t_max_y > 1:
+                return True
+            if t_max_x < t_max_y:
+                cell_x += step_x
+                t_max_x += t_delta_x
+            else:
+                cell_y += step_y
+                t_max_y += t_delta_y
+        return False
+
+#Class that stores, for every walkable cell near the target, the next cell on a shortest path to it
+class FlowField():
+    def __init__(self, walkable_cells):
+        self.walkable_cells = walkable_cells
+        self.target = None
+        self.next_cells = {}    #cell -> neighbouring cell one step closer to the target
+
+    def update(self, target):
+        #only rebuild the field when the target moves into a different cell
+        if target == self.target:
+            return
+        self.target = target
+        self.next_cells = {target: target}
+        if target not in self.walkable_cells:
+            return
+
+        #breadth first search out from the target, up to the chase range
+        frontier = deque([(target, 0)])
+        while frontier:
+            cell, steps = frontier.popleft()
+            if steps >= cons.CHASE_RANGE:
+                continue
+            for step_x, step_y in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                neighbour = (cell[0] + step_x, cell[1] + step_y)
+                if neighbour in self.next_cells or neighbour not in self.walkable_cells:
+                    continue
+                #don't cut diagonally across the corner of a wall
+                if step_x != 0 and step_y != 0:
+                    if (cell[0] + step_x, cell[1]) not in self.walkable_cells or (cell[0], cell[1] + step_y) not in self.walkable_cells:
+                        continue
+                self.next_cells[neighbour] = cell
+                frontier.append((neighbour, steps + 1))
+
+    def next_cell(self, cell):
+        #None if the cell is out of range or can't reach the target
+        return self.next_cells.get(cell)
@@ -12,12 +12,7 @@ class Item(pygame.sprite.Sprite):
         self.rect.center = (x,y)
         self.dummy_coin = dummy_coin
 
-    def update(self, screen_scroll, player, coin_fx, heal_fx):
-        #reposition the item based on screen scroll
-        if not self.dummy_coin:
-            self.rect.x += screen_scroll[0]
-            self.rect.y += screen_scroll[1]
-
+    def update(self, player, coin_fx, heal_fx):
         #check if the item has been collected by the player
         if self.rect.colliderect(player.rect) and not(self.dummy_coin):
             #what item has been collected
@@ -49,5 +44,9 @@ class Item(pygame.sprite.Sprite):
             if self.frame_index >= len(self.animation_list):
                 self.frame_index = 0
     
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
\ No newline at end of file
+    def draw(self, surface, camera = None):
+        #the score coin lives on the panel so it is never moved by the camera
+        if camera == None or self.dummy_coin:
+            surface.blit(self.image, self.rect)
+        else:
+            camera.blit(surface, self.image, self.rect.topleft)
\ No newline at end of file
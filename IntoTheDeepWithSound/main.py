@@ -1,15 +1,22 @@
 import pygame
 from pygame import mixer
-import csv
 import json
 from pathlib import Path
 
 import constants as cons
-from world import World
+from world import World, LevelTemplate
 from character import Character
-from weapon import Weapon
+from weapon import Weapon, rotation_cache, arrow_pool, fireball_pool
 from items import Item
 from button import Button
+from camera import Camera
+from assets import AssetManifest, SurfaceCache, ImageLoader
+from atlas import Atlas
+from render import RenderQueue, DirtyRects, TextCache, GlyphAtlas
+from pool import SpritePool
+from projectiles import ProjectileStore
+import grid
+import level_data
 
 pygame.init()
 
@@ -21,7 +28,6 @@ CLOCK = pygame.time.Clock()
 
 #Define game variables
 level = 1
-screen_scroll = [0, 0]
 start_game = False
 pause_game = False
 start_intro = False
@@ -30,15 +36,18 @@ player_health = 100
 player_score = 0
 frame_counter = 0
 
+#index every asset file once instead of searching the folders for each one
+asset_manifest = AssetManifest()
+
 #Function to help find and get paths to load assets
-def find_relative_path(file_name) -> Path | None:
-    start_dir = Path.cwd()
-    for path in start_dir.rglob(file_name):
-        return str(path.relative_to(start_dir))
-    return None
+def find_relative_path(file_name, required = True) -> Path | None:
+    return asset_manifest.find(file_name, required)
+
+#the save is read from and written to the game folder, wherever the game is started from
+save_path = asset_manifest.root / "saves" / "into_the_deep_save_data.json"
 
 try:
-    with open (find_relative_path("saves/into_the_deep_save_data.json"),"r") as save_file:
+    with open (save_path,"r") as save_file:
         save_data = json.load(save_file)
         level = save_data.get("level")
         player_health = save_data.get("health")
@@ -65,78 +74,88 @@ heal_fx = load_sound("assets/audio/heal.wav",cons.SOUND_EFFECT_VOLUME)
 
 #load game font
 font = pygame.font.Font(find_relative_path("assets/fonts/AtariClassic.ttf"), 17)
+text_cache = TextCache()
+
+#keep scaled images on disk so later launches skip decoding and scaling,
+#and decode them on a thread pool so only the display conversion happens here
+image_loader = ImageLoader(asset_manifest, SurfaceCache())
+#sprites drawn every frame share a few large surfaces instead of one each
+sprite_atlas = Atlas()
+
+#Function to load and scale an image
+def load_img(file_name, scale, atlas = None):
+    return image_loader.load_all([(file_name, scale)], atlas)[0]
 
-#Function to help scale images
-def scale_img(image,scale):
-    w = image.get_width()
-    h = image.get_height()
-    trasformed_image = pygame.transform.scale(image,(w*scale, h*scale))
-    return trasformed_image
+#Function to load and scale a list of (file name, scale) images at the same time
+def load_images(images, atlas = None):
+    return image_loader.load_all(images, atlas)
 
 #load backgounds
-menu_background_image = scale_img(pygame.image.load(find_relative_path("assets/images/backgrounds/menu_background.png")).convert_alpha(), 1)
-pause_background_image = scale_img(pygame.image.load(find_relative_path("assets/images/backgrounds/pause_background.png")).convert_alpha(), 1)
+menu_background_image, pause_background_image = load_images([
+    ("assets/images/backgrounds/menu_background.png", 1),
+    ("assets/images/backgrounds/pause_background.png", 1)])
 
 #load tile_map images
-tile_list = []
-for x in range(cons.TILE_TYPES):
-    img = pygame.image.load(find_relative_path(f"assets/images/tiles/{x}.png")).convert_alpha()
-    img = scale_img(img,cons.global_scale)
-    tile_list.append(img)
+tile_list = load_images([(f"assets/images/tiles/{x}.png", cons.global_scale) for x in range(cons.TILE_TYPES)], sprite_atlas)
 
 #load character images
 mob_types = ["elf", "imp", "skeleton", "goblin", "muddy", "tiny_zombie", "big_demon"]
+animation_types = ["idle","run"]
+mob_frame_files = [(f"assets/images/characters/{mob}/{animation}/{i}.png", cons.global_scale)
+                   for mob in mob_types for animation in animation_types for i in range(4)]
+mob_frames = load_images(mob_frame_files, sprite_atlas)
+#flip every frame once here so characters facing left don't need flipping each time they are drawn
+flipped_mob_frames = sprite_atlas.pack([(f"{file_name}:flipped", pygame.transform.flip(frame, True, False))
+                                        for (file_name, scale), frame in zip(mob_frame_files, mob_frames)])
+mob_frames = iter(zip(mob_frames, flipped_mob_frames))
 mobs_animation_list = [] 
 for mob in mob_types:
     #Creating a character
-    animation_types = ["idle","run"]
     animation_list = []
     for animation in animation_types:
-        temp_list = []
-        for i in range(4):
-            img = pygame.image.load(find_relative_path(f"assets/images/characters/{mob}/{animation}/{i}.png")).convert_alpha()
-            img = scale_img(img,cons.global_scale)
-            temp_list.append(img)
+        #each frame is a (facing right, facing left) pair
+        temp_list = [next(mob_frames) for i in range(4)]
         #Adding temp list to main list (Creates sub list)
         animation_list.append(temp_list)
     mobs_animation_list.append(animation_list)
 
 #load player health images
-heart_empty = scale_img(pygame.image.load(find_relative_path("assets/images/items/heart_empty.png")).convert_alpha(),cons.item_scale)
-heart_half = scale_img(pygame.image.load(find_relative_path("assets/images/items/heart_half.png")).convert_alpha(),cons.item_scale)
-heart_full = scale_img(pygame.image.load(find_relative_path("assets/images/items/heart_full.png")).convert_alpha(),cons.item_scale)
+heart_empty, heart_half, heart_full = load_images([
+    ("assets/images/items/heart_empty.png", cons.item_scale),
+    ("assets/images/items/heart_half.png", cons.item_scale),
+    ("assets/images/items/heart_full.png", cons.item_scale)])
 
 #load enemy health images
-enemy_health_list = []
-for x in range(cons.HEALTH_BAR_TYPES):
-    img = scale_img(pygame.image.load(find_relative_path(f"assets/images/health_bars/{x}.png")).convert_alpha(),cons.global_scale)
-    enemy_health_list.append(img)
+health_bar_files = [(f"assets/images/health_bars/{x}.png", cons.global_scale) for x in range(cons.HEALTH_BAR_TYPES)]
+enemy_health_list = load_images(health_bar_files, sprite_atlas)
+#bosses get bars twice as wide
+boss_health_list = sprite_atlas.pack([(f"{file_name}:boss", pygame.transform.scale(image, (image.get_width() * 2, image.get_height())))
+                                      for (file_name, scale), image in zip(health_bar_files, enemy_health_list)])
 
 #load weapon images
-bow_image = scale_img(pygame.image.load(find_relative_path("assets/images/weapons/bow.png")).convert_alpha(),cons.bow_scale)
-arrow_image = scale_img(pygame.image.load(find_relative_path("assets/images/weapons/arrow.png")).convert_alpha(),cons.bow_scale)
-fireball_image = scale_img(pygame.image.load(find_relative_path("assets/images/weapons/fireball.png")).convert_alpha(),cons.fireball_scale)
+bow_image, arrow_image, fireball_image = load_images([
+    ("assets/images/weapons/bow.png", cons.bow_scale),
+    ("assets/images/weapons/arrow.png", cons.bow_scale),
+    ("assets/images/weapons/fireball.png", cons.fireball_scale)])
+#rotate them to every angle up front so aiming and shooting never has to
+for image in (bow_image, arrow_image, fireball_image):
+    rotation_cache.prerender(image)
 
 #load item images
-coin_images = []
-for i in range(4):
-    img = pygame.image.load(find_relative_path(f"assets/images/items/coin_f{i}.png")).convert_alpha()
-    img = scale_img(img,cons.item_scale)
-    coin_images.append(img)
+coin_images = load_images([(f"assets/images/items/coin_f{i}.png", cons.item_scale) for i in range(4)], sprite_atlas)
 
-red_potion_image = scale_img(pygame.image.load(find_relative_path(f"assets/images/items/potion_red.png")).convert_alpha(), cons.potion_scale)
+red_potion_image = load_img(f"assets/images/items/potion_red.png", cons.potion_scale, sprite_atlas)
 
 item_images = []
 item_images.append(coin_images)
 item_images.append([red_potion_image])
 
 #load button images 
-exit_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/exit_button.png")).convert_alpha(), cons.button_scale)
-restart_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/restart_button.png")).convert_alpha(), cons.button_scale)
-resume_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/resume_button.png")).convert_alpha(), cons.button_scale)
-start_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/play_button.png")).convert_alpha(), cons.button_scale)
-new_game_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/new_game_button.png")).convert_alpha(), cons.button_scale)
-back_button_img = scale_img(pygame.image.load(find_relative_path(f"assets/images/buttons/back_button.png")).convert_alpha(), cons.button_scale)
+exit_button_img, restart_button_img, resume_button_img, start_button_img, new_game_button_img, back_button_img = load_images(
+    [(f"assets/images/buttons/{button}.png", cons.button_scale) for button in ["exit_button", "restart_button", "resume_button", "play_button", "new_game_button", "back_button"]])
+
+#pre-render the damage number digits so hits don't need the font
+damage_glyphs = GlyphAtlas(font, [cons.RED], sprite_atlas)
 
 #Function to reset level data
 def reset_level():
@@ -145,14 +164,20 @@ def reset_level():
     damage_text_group.empty()
     item_group.empty()
     fireball_group.empty()
+    arrow_store.clear()
+    fireball_store.clear()
 
-    #create an empty world
-    empty_data = []
-    for row in range(cons.ROWS):
-        r = [-1]*cons.COLS
-        empty_data.append(r)
-    
-    return empty_data
+#Function to read a level file into a grid of tile types
+def read_level_data(level):
+    #use the compiled level file when there is one (see level_data.py), otherwise the csv
+    return level_data.load(find_relative_path(f"levels/level{level}_data.csv"), find_relative_path(f"levels/level{level}_data.lvl", False))
+
+#Function to build the static part of a level (tile grid, collision grid and spawn list, the map chunks are baked later)
+def build_level_template(level):
+    return LevelTemplate(read_level_data(level), tile_list)
+
+#keep recently played levels in memory so restarting never reloads them from disk
+level_cache = level_data.LevelCache(build_level_template)
 
 #Function to make sprite groups
 def make_groups(world):
@@ -165,21 +190,19 @@ def make_groups(world):
 
     for item in world.item_list:
         item_group.add(item)
+    for enemy in world.character_list:
+        health_text_group.add(HealthBar(enemy))
     
     return arrow_group, health_text_group, damage_text_group, item_group, fireball_group
 
 #Function to load a level
 def load_level(level, health, score):
-    world_data = reset_level()
-    #load level file to create world
-    with open(find_relative_path(f"levels/level{level}_data.csv"), newline="") as csvfile:
-        reader = csv.reader(csvfile, delimiter= ",")
-        for x, row in enumerate(reader):
-            for y, tile in enumerate(row):
-                world_data[x][y] = int(tile)
-            #Create the world
+    reset_level()
+    #Create the world from the cached level, only the characters and items are new
     world = World() 
-    world.process_data(world_data, tile_list, mobs_animation_list, item_images)
+    world.spawn(level_cache.get(level), mobs_animation_list, item_images)
+    #load the next level while this one is played so the transition doesn't stall
+    level_cache.prefetch(level + 1)
         
     #Reset player to before death status
     player = world.player
@@ -188,6 +211,10 @@ def load_level(level, health, score):
 
     #Extract enemies from world data
     enemy_list = world.character_list
+
+    #move the camera back to the start of the level
+    camera.reset()
+    dirty_rects.invalidate()
                     
     score_coin = Item(cons.SCREEN_WIDTH - 115, 23 , 0 , coin_images, True)
 
@@ -206,39 +233,51 @@ def calc_health(enemy):
             return x
     return 12
 
-#Function that outputs text onto the screen
-def draw_text(text, font, text_color, x, y, scale = 1):
-    img = font.render(text, True, text_color)
-    img = scale_img(img, scale)
-    screen.blit(img, (x, y))
-
-#Function that displays general game information
-def draw_info():
-    #draw panel
-    pygame.draw.rect(screen, cons.Panel, (0, 0, cons.SCREEN_WIDTH + 100 , 50))
-    pygame.draw.line(screen, cons.WHITE, (0, 50), (cons.SCREEN_WIDTH + 100, 50))
-
-    #draw player lives
-    half_heart_drawn = False
-    for i in range(5):
-        if player.health >= ((i + 1 ) * 20):
-            screen.blit(heart_full , (10 + (i * 50), 0))
-        elif player.health <= 0:
-            screen.blit(heart_empty , (10 + (i * 50), 0))
-        elif (player.health % 20 >= 5 or (player.health < 20)) and half_heart_drawn == False:
-            screen.blit(heart_half , (10 + (i * 50), 0))
-            half_heart_drawn = True
-        else:
-            screen.blit(heart_empty , (10 + (i * 50), 0))
-    
-    #draw player health
-    draw_text(f"{player.health}%", font, cons.WHITE, 264, 16)
+#Function that outputs text onto the screen (or another surface)
+def draw_text(text, font, text_color, x, y, scale = 1, surface = None):
+    if surface == None:
+        surface = screen
+    img = text_cache.render(text, font, text_color, scale)
+    surface.blit(img, (x, y))
+
+#Class that displays general game information, only redrawing the panel when what it shows changes
+class InfoPanel():
+    def __init__(self):
+        self.image = pygame.Surface((cons.SCREEN_WIDTH, 51)).convert()
+        self.shown = None   #(health, score, level) currently drawn on the panel
+
+    def draw(self, surface, health, score, level):
+        if (health, score, level) != self.shown:
+            self.shown = (health, score, level)
+            self.redraw(health, score, level)
+        surface.blit(self.image, (0, 0))
+
+    def redraw(self, health, score, level):
+        #draw panel
+        pygame.draw.rect(self.image, cons.Panel, (0, 0, cons.SCREEN_WIDTH + 100 , 50))
+        pygame.draw.line(self.image, cons.WHITE, (0, 50), (cons.SCREEN_WIDTH + 100, 50))
+
+        #draw player lives
+        half_heart_drawn = False
+        for i in range(5):
+            if health >= ((i + 1 ) * 20):
+                self.image.blit(heart_full , (10 + (i * 50), 0))
+            elif health <= 0:
+                self.image.blit(heart_empty , (10 + (i * 50), 0))
+            elif (health % 20 >= 5 or (health < 20)) and half_heart_drawn == False:
+                self.image.blit(heart_half , (10 + (i * 50), 0))
+                half_heart_drawn = True
+            else:
+                self.image.blit(heart_empty , (10 + (i * 50), 0))
+        
+        #draw player health
+        draw_text(f"{health}%", font, cons.WHITE, 264, 16, surface = self.image)
 
-    #draw level info
-    draw_text(f"LEVEL:{level}", font, cons.WHITE, cons.SCREEN_WIDTH // 2 - 76, 16)
+        #draw level info
+        draw_text(f"LEVEL:{level}", font, cons.WHITE, cons.SCREEN_WIDTH // 2 - 76, 16, surface = self.image)
 
-    #draw the score
-    draw_text(f"X{player.score}", font, cons.WHITE, cons.SCREEN_WIDTH-104, 16)
+        #draw the score
+        draw_text(f"X{score}", font, cons.WHITE, cons.SCREEN_WIDTH-104, 16, surface = self.image)
 
 #Class that handles screen fades
 class ScreenFade():
@@ -275,44 +314,57 @@ class ScreenFade():
 
 #Class that keeps that tracks of enemy health
 class HealthBar(pygame.sprite.Sprite):
-    def __init__(self, x, y, health_level, enemy):
+    def __init__(self, enemy):
         pygame.sprite.Sprite.__init__(self)
-        self.health_level = health_level
-        self.image = enemy_health_list[health_level]
+        self.enemy = enemy
         if enemy.boss == True:
-            #make health bar bigger if the enemy is a boss
-            w = self.image.get_width()
-            h = self.image.get_height()
-            self.image = pygame.transform.scale(self.image,(w*2, h))
-
-        self.rect = self.image.get_rect()
-        self.rect.center = (x,y)
-        self.counter = 0
-    
-    def update(self, screen_scroll):
-        #reposition the bar based on screen scroll
-        self.rect.x += screen_scroll[0]
-        self.rect.y += screen_scroll[1]
-        
-        #kill the bar so that the new one can replace it
-        self.counter += 1
-        if (self.counter >= 2):
-            self.kill()
+            #boss bars were made bigger when they were loaded
+            self.bar_images = boss_health_list
+        else:
+            self.bar_images = enemy_health_list
+        self.health_level = None
+        self.shown = True
+        self.set_level(calc_health(enemy))
+        self.rect.center = (enemy.rect.centerx, enemy.rect.bottom + 18)
+
+    def set_level(self, health_level):
+        #only swap the image when the health level changes
+        if health_level != self.health_level:
+            self.health_level = health_level
+            self.image = self.bar_images[health_level]
+            self.rect = self.image.get_rect()
+
+    def update(self):
+        if self.enemy.alive == True:
+            self.set_level(calc_health(self.enemy))
+        else:
+            self.set_level(0)
+            death_counter = self.enemy.death_flash()
+            self.shown = death_counter % 2 == 0     #0: show bar 1: dont show bar
+            #the enemy is about to become a corpse, so the bar is done with
+            if self.enemy.finished_dying():
+                self.kill()
+        #keep the bar under the enemy
+        self.rect.center = (self.enemy.rect.centerx, self.enemy.rect.bottom + 18)
+
+    def draw(self, surface, camera):
+        if self.shown:
+            camera.blit(surface, self.image, self.rect.topleft)
 
 #Class that keeps that tracks of damage dealt to an enemy
 class DamageText(pygame.sprite.Sprite):
     def __init__(self, x, y, damage, color):
         pygame.sprite.Sprite.__init__(self)
-        self.image = font.render(damage, True, color)
+        self.reset(x, y, damage, color)
+
+    def reset(self, x, y, damage, color):
+        #set up new (or recycled) text
+        self.image = damage_glyphs.render(damage, color)
         self.rect = self.image.get_rect()
         self.rect.center = (x,y)
         self.counter = 0
 
-    def update(self, screen_scroll):
-        #reposition the text based on screen scroll
-        self.rect.x += screen_scroll[0]
-        self.rect.y += screen_scroll[1]
-
+    def update(self):
         #make the text float upwards
         self.rect.y -= 1
         
@@ -321,21 +373,22 @@ class DamageText(pygame.sprite.Sprite):
         if (self.counter >35):
             self.kill()
 
-#create an empty world
-world_data = []
-for row in range(cons.ROWS):
-    r = [-1]*cons.COLS
-    world_data.append(r)
-#load level file to create world
-with open(find_relative_path(f"levels/level{level}_data.csv"), newline="") as csvfile:
-    reader = csv.reader(csvfile, delimiter= ",")
-    for x, row in enumerate(reader):
-        for y, tile in enumerate(row):
-            world_data[x][y] = int(tile)
+damage_text_pool = SpritePool(DamageText, cons.DAMAGE_TEXT_POOL_SIZE)
+
+#arrays that move and hit test the arrows and fireballs all at once when there are a lot of them
+arrow_store = ProjectileStore(cons.arrow_stuck_frames, cons.ARROW_BATCH_SIZE)
+fireball_store = ProjectileStore(cons.fireball_stuck_frames, cons.FIREBALL_BATCH_SIZE)
 
 #Create the world
 world = World() 
-world.process_data(world_data, tile_list, mobs_animation_list, item_images)
+world.spawn(level_cache.get(level), mobs_animation_list, item_images)
+level_cache.prefetch(level + 1)
+
+#Create the camera (everything in the world is stored in world co-ordinates)
+camera = Camera()
+render_queue = RenderQueue()
+info_panel = InfoPanel()
+dirty_rects = DirtyRects()
 
 #Player event variables
 move_Left = False 
@@ -365,6 +418,8 @@ fireball_group = pygame.sprite.Group()
 
 for item in world.item_list:
     item_group.add(item)
+for enemy in enemy_list:
+    health_text_group.add(HealthBar(enemy))
 
 #make level starting fade
 intro_fade = ScreenFade(1, cons.BLACK, 4)
@@ -392,6 +447,7 @@ while running:
 
     if start_game == False:
         frame_counter = 0
+        dirty_rects.set_view("menu")
         screen.blit(menu_background_image, (0,0))
         mixer.music.pause()
         draw_text("INTO THE DEEP", font, cons.WHITE, cons.SCREEN_WIDTH // 2 - 348, 120, 3)
@@ -412,6 +468,7 @@ while running:
             running = False
     elif pause_game == True:
         frame_counter = 0
+        dirty_rects.set_view("pause")
         screen.blit(pause_background_image, (0,0))
         mixer.music.pause()
         draw_text("PAUSED", font, cons.WHITE, cons.SCREEN_WIDTH // 2 - 166, 120, 3)
@@ -432,6 +489,9 @@ while running:
             world, player, enemy_list, score_coin = load_level(level,player_health,player_score)
             arrow_group,health_text_group,damage_text_group,item_group,fireball_group = make_groups(world)
     else:
+        #(the game over screen counts as its own view, see below)
+        if player.alive:
+            dirty_rects.set_view("game")
         screen.fill(cons.BackGround)
         mixer.music.unpause()
         if frame_counter <= 10:
@@ -450,57 +510,68 @@ while running:
                 delta_y += cons.player_speed
 
             #move all objects
-            screen_scroll, level_complete = player.move(delta_x, delta_y, world.obstacle_tiles, world.exit_tile, interact_check)
+            level_complete = player.move(delta_x, delta_y, world.wall_grid, world.exit_rect, interact_check)
+            camera.follow(player.rect)
+            #the whole map moves on screen when the camera scrolls
+            if camera.scroll != [0, 0]:
+                dirty_rects.invalidate()
+            world.flow_field.update(grid.to_cell(player.rect.centerx, player.rect.centery))
 
             #update all objects
-            world.update(screen_scroll)
             player.update_sprite()
+            if world.enemy_store != None:
+                world.enemy_store.update(player, world.wall_grid, world.flow_field, fireball_image, fireball_group)
             for enemy in enemy_list:
-                fireball = enemy.ai(player, world.obstacle_tiles, screen_scroll, fireball_image)
-                if fireball:
-                    fireball_group.add(fireball)
+                if world.enemy_store == None:
+                    fireball = enemy.ai(player, world.wall_grid, world.flow_field, fireball_image)
+                    if fireball:
+                        fireball_group.add(fireball)
                 enemy.update_sprite()
-                if enemy.alive == True:
-                    health_level = calc_health(enemy)
-                    enemy_health = HealthBar(enemy.rect.centerx , enemy.rect.bottom + 18 , health_level, enemy)
-                    health_text_group.add(enemy_health)
-                if enemy.alive == False:
-                    death_counter = enemy.death_flash()
-                    if death_counter % 2 == 0:  #0: show bar 1: dont show bar
-                        enemy_health = HealthBar(enemy.rect.centerx , enemy.rect.bottom + 18 , 0, enemy)
-                        health_text_group.add(enemy_health)
-            arrow = bow.update_weapon(player)
+            arrow = bow.update_weapon(player, camera)
             if arrow != None and frame_counter >= 8:
                 arrow_group.add(arrow)
                 arrow_shot_fx.play() #play sound
-            for arrow in arrow_group:
-                damage, damage_pos = arrow.update(screen_scroll, enemy_list, world.obstacle_tiles)
-                if damage != 0:
-                    damage_text = DamageText(damage_pos.centerx , damage_pos.y, str(damage), cons.RED)
+            for damage, damage_pos in arrow_store.update_arrows(arrow_group, enemy_list, world.wall_grid, camera):
+                damage_text = damage_text_pool.get(damage_pos.centerx , damage_pos.y, str(damage), cons.RED)
+                if damage_text != None:
                     damage_text_group.add(damage_text)
-                    arrow_hit_fx.play() #play sound
-            for fireball in fireball_group:
-                fireball.update(screen_scroll, player, world.obstacle_tiles)
-            item_group.update(screen_scroll, player, coin_collect_fx, heal_fx)
-            health_text_group.update(screen_scroll)
-            damage_text_group.update(screen_scroll)
-            score_coin.update(screen_scroll,player, coin_collect_fx, heal_fx)
+                arrow_hit_fx.play() #play sound
+            fireball_store.update_fireballs(fireball_group, player, world.wall_grid, camera)
+            item_group.update(player, coin_collect_fx, heal_fx)
+            health_text_group.update()
+            #enemies whose death flash is over become part of the map
+            if world.retire_dead():
+                dirty_rects.invalidate()
+            damage_text_group.update()
+            score_coin.update(player, coin_collect_fx, heal_fx)
         
         #Draw all objects
-        world.draw(screen)
-        player.draw(screen)
+        #queue everything in the world by layer, then draw each layer with a single call
+        camera.begin_frame()
+        world.draw(render_queue.layer("tiles"), camera)
+        player.draw(render_queue.layer("characters"), camera)
         for enemy in enemy_list:
-            enemy.draw(screen)
-        bow.draw(screen)
+            enemy.draw(render_queue.layer("characters"), camera)
+        bow.draw(render_queue.layer("projectiles"), camera)
         for arrow in arrow_group:
-            arrow.draw(screen)
+            arrow.draw(render_queue.layer("projectiles"), camera)
         for fireball in fireball_group:
-            fireball.draw(screen)
-        item_group.draw(screen)
-        health_text_group.draw(screen)
-        damage_text_group.draw(screen)
-        draw_info()
+            fireball.draw(render_queue.layer("projectiles"), camera)
+        camera.draw_group(render_queue.layer("items"), item_group)
+        for health_bar in health_text_group:
+            health_bar.draw(render_queue.layer("ui"), camera)
+        camera.draw_group(render_queue.layer("ui"), damage_text_group)
+        render_queue.flush(screen, dirty_rects)
+        info_panel.draw(screen, player.health, player.score, level)
         score_coin.draw(screen)
+        dirty_rects.add((0, 0, cons.SCREEN_WIDTH, 51))
+
+        #show how many draws the camera skipped this frame, and the most arrows, fireballs
+        #and damage numbers that have been in use at once out of their pool sizes
+        if cons.SHOW_DRAW_STATS:
+            pools = " ".join(f"{pool.high_water_mark}/{pool.capacity}" for pool in (arrow_pool, fireball_pool, damage_text_pool))
+            draw_text(f"DRAWN:{camera.drawn} CULLED:{camera.culled} POOLS:{pools}", font, cons.WHITE, 10, cons.SCREEN_HEIGHT - 30)
+            dirty_rects.add((0, cons.SCREEN_HEIGHT - 30, cons.SCREEN_WIDTH, 30))
 
         if level_complete == True:
             level += 1
@@ -512,6 +583,9 @@ while running:
 
         #show level intro
         if start_intro == True:
+            dirty_rects.invalidate()
+            #the map is hidden for now, so get its chunks ready before the player walks into them
+            world.bake_chunks(cons.CHUNK_BAKES_PER_FRAME)
             if intro_fade.fade() == True:
                 start_intro = False
                 intro_fade.fade_counter = 0
@@ -519,6 +593,8 @@ while running:
         #show death screen
         if player.alive == False:
             if death_fade.fade():
+                #the game over screen stays the same once the fade has finished
+                dirty_rects.set_view("game_over")
                 if restart_button.draw(screen):
                     death_fade.fade_counter = 0
                     start_intro = True
@@ -526,6 +602,8 @@ while running:
                     arrow_group, health_text_group, damage_text_group, item_group, fireball_group = make_groups(world)
                 if exit_button.draw(screen):
                     running = False
+            else:
+                dirty_rects.invalidate()
         
     interact_check = False #get only 1 instance of button press
     #event handler
@@ -553,6 +631,7 @@ while running:
                     screen = pygame.display.set_mode((cons.SCREEN_WIDTH,cons.SCREEN_HEIGHT), pygame.FULLSCREEN)
                 else:
                     screen = pygame.display.set_mode((cons.SCREEN_WIDTH,cons.SCREEN_HEIGHT))
+                dirty_rects.invalidate()
 
         #check keyboard press release
         if event.type == pygame.KEYUP:
@@ -565,9 +644,10 @@ while running:
             if event.key == pygame.K_DOWN or event.key == pygame.K_s:
                 move_Down= False
     
-    pygame.display.update()
+    dirty_rects.present()
 
-with open ("saves/into_the_deep_save_data.json","w") as save_file:
+save_path.parent.mkdir(exist_ok=True)
+with open (save_path,"w") as save_file:
     save_data = {
         "level":level,
         "health":player_health,
@@ -575,4 +655,6 @@ with open ("saves/into_the_deep_save_data.json","w") as save_file:
     }
     json.dump(save_data,save_file)  
   
+#let the loader thread finish before pygame goes away
+level_cache.worker.shutdown(wait=True)
 pygame.quit()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import random
+import numpy as np
+import pygame
+import constants as cons
+import weapon
+from character import Character
+from enemy_store import EnemyStore
+from grid import WallGrid, FlowField, mask_cells, to_cell
+
+#run with "python -m pytest" from this folder
+
+#every character type gets the same blank frames, [action][frame][faces left]
+frame = pygame.Surface((cons.TILE_SIZE, cons.TILE_SIZE))
+mob_animations = [[[(frame, frame)] * 4] * 2] * 7
+
+def make_level(seed):
+    #open ground with some walls dotted about and a wall all the way round
+    solid = np.random.default_rng(seed).random((24, 32)) < 0.08
+    solid[[0, -1], :] = True
+    solid[:, [0, -1]] = True
+    return WallGrid(solid), mask_cells(~solid)
+
+def make_characters(seed, walkable_cells):
+    random.seed(seed)
+    cells = sorted(walkable_cells)
+    def centre(cell):
+        return cell[0] * cons.TILE_SIZE, cell[1] * cons.TILE_SIZE
+    player = Character(*centre(random.choice(cells)), 100000, mob_animations, 0, False, 1)
+    enemies = [Character(*centre(random.choice(cells)), 100, mob_animations, random.randint(1, 5), False, 1) for i in range(30)]
+    enemies += [Character(*centre(random.choice(cells)), 400, mob_animations, 6, True, 2) for i in range(3)]
+    return player, enemies, FlowField(walkable_cells), pygame.sprite.Group()
+
+def state(player, enemies, flow_field, fireballs):
+    return ([(enemy.rect.topleft, enemy.flipper, enemy.isRunning, enemy.action_type, enemy.frame_index, enemy.hit, enemy.alive) for enemy in enemies],
+            (player.rect.topleft, player.health, player.hit, player.last_hit), [fireball.rect.center for fireball in fireballs])
+
+def test_store_matches_character_ai(monkeypatch):
+    #the same enemies updated one at a time and in arrays must stay identical every frame
+    now = [0]
+    monkeypatch.setattr(pygame.time, "get_ticks", lambda: now[0])
+    fireball_image = pygame.Surface((10, 10))
+    wall_grid, walkable_cells = make_level(5)
+    one_at_a_time = make_characters(6, walkable_cells)
+    batched = make_characters(6, walkable_cells)
+    exit_rect = pygame.Rect(-1000, -1000, 1, 1)     #somewhere the player never goes
+    enemy_store = EnemyStore(batched[1])
+    fireballs_fired = 0
+    for frame in range(1500):
+        #about 60 frames a second
+        now[0] = frame * 1000 // 60
+        #the player wanders about (standing still every other time, so the bosses can catch up), and arrows hit or
+        #kill random enemies (the same ones on both sides)
+        random.seed(-frame)
+        if frame % 40 == 0:
+            step = (random.randint(-1, 1) * cons.player_speed, random.randint(-1, 1) * cons.player_speed)
+            if frame % 80 == 0:
+                step = (0, 0)
+        hit = random.randrange(len(one_at_a_time[1]))
+        killed = random.randrange(len(one_at_a_time[1])) if frame % 150 == 0 else None
+
+        for side in (one_at_a_time, batched):
+            player, enemies, flow_field, fireballs = side
+            player.move(step[0], step[1], wall_grid, exit_rect, False)
+            if frame % 3 == 0:
+                enemies[hit].hit = True
+            if killed != None:
+                enemies[killed].alive = False
+            flow_field.update(to_cell(player.rect.centerx, player.rect.centery))
+
+        player, enemies, flow_field, fireballs = one_at_a_time
+        random.seed(frame)
+        player.update_sprite()
+        for enemy in enemies:
+            fireball = enemy.ai(player, wall_grid, flow_field, fireball_image)
+            if fireball:
+                fireballs.add(fireball)
+            enemy.update_sprite()
+
+        player, enemies, flow_field, fireballs = batched
+        random.seed(frame)
+        player.update_sprite()
+        enemy_store.update(player, wall_grid, flow_field, fireball_image, fireballs)
+        for enemy in enemies:
+            enemy.update_sprite()
+
+        assert state(*batched) == state(*one_at_a_time)
+        #only the fireballs fired this frame are compared, then they go back to the pool
+        fireballs_fired += len(fireballs)
+        for side in (one_at_a_time, batched):
+            side[3].empty()
+    #make sure the run got as far as enemies attacking and the bosses shooting
+    assert one_at_a_time[0].health < 100000
+    assert fireballs_fired > 0
\ No newline at end of file
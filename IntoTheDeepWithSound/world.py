@@ -1,68 +1,177 @@
+import pygame
+import numpy as np
 import constants as cons
 from character import Character
 from items import Item
+from grid import WallGrid, FlowField, cell_rect, mask_cells
+from enemy_store import EnemyStore
+
+#per tile type lookup tables (the extra last entry is for empty cells, so a -1 tile indexes it)
+SOLID_TILES = np.zeros(cons.TILE_TYPES + 1, dtype=bool)
+SOLID_TILES[7] = True       #wall
+EXIT_TILES = np.zeros(cons.TILE_TYPES + 1, dtype=bool)
+EXIT_TILES[8] = True        #ladder
+SPAWN_TILES = np.zeros(cons.TILE_TYPES + 1, dtype=bool)
+SPAWN_TILES[9:18] = True    #items, player and enemies (drawn as floor)
+
+def chunk_rect(chunk):
+   #tiles are centred on their grid point so chunks start half a tile up and left
+   chunk_px = cons.CHUNK_SIZE * cons.TILE_SIZE
+   return pygame.Rect(chunk[0] * chunk_px - cons.TILE_SIZE // 2, chunk[1] * chunk_px - cons.TILE_SIZE // 2, chunk_px, chunk_px)
+
+def chunk_tiles(tiles, chunk):
+   return tiles[chunk[1] * cons.CHUNK_SIZE:(chunk[1] + 1) * cons.CHUNK_SIZE, chunk[0] * cons.CHUNK_SIZE:(chunk[0] + 1) * cons.CHUNK_SIZE]
+
+def render_chunk(tiles, tile_images, chunk):
+   #chunks are drawn first each frame so the background colour can be baked in, keeping them opaque
+   chunk_surface = pygame.Surface(chunk_rect(chunk).size).convert()
+   chunk_surface.fill(cons.BackGround)
+   tiles = chunk_tiles(tiles, chunk)
+   for y, x in np.argwhere(tiles >= 0):
+      image = tile_images[tiles[y, x]]
+      image_rect = image.get_rect()
+      image_rect.center = (int(x) * cons.TILE_SIZE + cons.TILE_SIZE // 2, int(y) * cons.TILE_SIZE + cons.TILE_SIZE // 2)
+      chunk_surface.blit(image, image_rect)
+   return chunk_surface
+
+#Class that holds the parts of a level that never change while it is played, so restarts can reuse them
+class LevelTemplate():
+   def __init__(self, data, tile_list):
+      self.tiles = np.array(data, dtype=np.int16)    #tile types, [row][column]
+      self.tiles.flags.writeable = False
+      self.tile_images = [tile_list[0] if SPAWN_TILES[tile] else tile_list[tile] for tile in range(cons.TILE_TYPES)] + [None]
+
+      #derive the collision and pathfinding grids from the tile types
+      self.solid = SOLID_TILES[self.tiles]
+      self.solid.flags.writeable = False
+      self.wall_grid = WallGrid(self.solid)
+      self.walkable_cells = mask_cells((self.tiles >= 0) & ~self.solid)
+
+      #ladder tile
+      self.exit_rect = None
+      exit_cells = np.argwhere(EXIT_TILES[self.tiles])
+      if len(exit_cells) > 0:
+         y, x = exit_cells[-1]
+         self.exit_rect = cell_rect((x, y))
+
+      #(tile type, x, y) of every item, player and enemy to create when the level starts
+      self.spawns = [(int(self.tiles[y, x]), int(x) * cons.TILE_SIZE, int(y) * cons.TILE_SIZE) for y, x in np.argwhere(SPAWN_TILES[self.tiles])]
+
+      #chunks with any tiles in them, baked into surfaces by each world on the main thread (templates are built
+      #on the loader thread, which must not blit the tile images the game is drawing with, and they stay in the
+      #level cache, which shouldn't hold on to surfaces)
+      self.chunk_coords = set()
+      rows, cols = self.tiles.shape
+      for chunk_y in range(-(-rows // cons.CHUNK_SIZE)):
+         for chunk_x in range(-(-cols // cons.CHUNK_SIZE)):
+            if (chunk_tiles(self.tiles, (chunk_x, chunk_y)) >= 0).any():
+               self.chunk_coords.add((chunk_x, chunk_y))
 
 class World():
    def __init__(self):
-      self.map_tiles = []
-      self.obstacle_tiles = []
-      self.exit_tile = None
+      self.tiles = None             #int16 array of tile types, [row][column] (read only, shared with the template)
+      self.tile_images = []         #tile type -> image drawn for it
+      self.solid = None             #bool array of wall cells
+      self.wall_grid = None         #wall cells for collision queries
+      self.flow_field = None        #shared path towards the player for every enemy
+      self.exit_rect = None
       self.item_list = []
       self.player = None
       self.character_list = []
+      self.enemy_store = None       #array based AI for every enemy (if cons.ENEMY_STORE is on)
+      self.chunk_coords = set()     #chunks with any tiles in them
+      self.chunks = {}              #chunk co-ords -> pre-rendered tile surface, baked as they are needed
+
+   def spawn(self, template, mob_animations, item_images):
+      #share everything static with the template and create fresh characters and items
+      self.tiles = template.tiles
+      self.tile_images = template.tile_images
+      self.solid = template.solid
+      self.wall_grid = template.wall_grid
+      self.flow_field = FlowField(template.walkable_cells)
+      if template.exit_rect != None:
+         self.exit_rect = template.exit_rect.copy()
+      self.chunk_coords = template.chunk_coords
+      self.chunks = {}
+
+      #iterate through each spawn tile of the level
+      for tile, image_x, image_y in template.spawns:
+         #perform actions based on the tile
+         if tile == 9 or tile == 10:
+            #coin or potion
+            item = Item(image_x, image_y, (tile-9), item_images[tile-9])
+            self.item_list.append(item)
+         elif tile == 11:
+            #player character
+            player = Character(image_x, image_y, 100, mob_animations, 0, False, 1)
+            self.player = player
+         elif tile >= 12 and tile<=16:
+            #basic enemies
+            enemy_health = [100,50,125,175,75]
+            enemy = Character(image_x, image_y, enemy_health[tile-12], mob_animations, tile - 11, False, 1)
+            self.character_list.append(enemy)
+         elif tile == 17:
+            #boss enemy
+            boss_enemy = Character(image_x, image_y, 400, mob_animations, 6, True, 2)
+            self.character_list.append(boss_enemy)
+
+      if cons.ENEMY_STORE:
+         self.enemy_store = EnemyStore(self.character_list)
+
+   def retire_dead(self):
+      #enemies that have finished dying are drawn into the map as corpses and dropped from the AI,
+      #collision and health bar updates, so they cost nothing from then on. returns how many were retired
+      keep = [not enemy.finished_dying() for enemy in self.character_list]
+      if all(keep):
+         return 0
+      for enemy, kept in zip(self.character_list, keep):
+         if not kept:
+            self.add_decal(enemy.image, enemy.rect.topleft)
+      if self.enemy_store != None:
+         self.enemy_store.retire(np.array(keep))
+      #main holds on to this list, so change it in place
+      self.character_list[:] = [enemy for enemy, kept in zip(self.character_list, keep) if kept]
+      return keep.count(False)
+
+   def chunk(self, chunk):
+      #surface of a chunk, baked the first time it is needed (None if the chunk is empty)
+      if chunk not in self.chunks:
+         if chunk not in self.chunk_coords:
+            return None
+         self.chunks[chunk] = render_chunk(self.tiles, self.tile_images, chunk)
+      return self.chunks[chunk]
+
+   def bake_chunks(self, count):
+      #bake a few chunks ahead of time, e.g. while the intro fade hides the map
+      for chunk in self.chunk_coords.difference(self.chunks):
+         if count <= 0:
+            return
+         self.chunk(chunk)
+         count -= 1
+
+   def add_decal(self, image, pos):
+      #draw an image into the map for good, on every chunk it touches
+      chunk_px = cons.CHUNK_SIZE * cons.TILE_SIZE
+      rect = pygame.Rect(pos, image.get_size()).move(cons.TILE_SIZE // 2, cons.TILE_SIZE // 2)
+      for chunk_y in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+         for chunk_x in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+            chunk = (chunk_x, chunk_y)
+            if self.chunk(chunk) == None:
+               #a chunk with no tiles in it, which now has something to draw
+               self.chunks[chunk] = render_chunk(self.tiles, self.tile_images, chunk)
+            chunk_pos = chunk_rect(chunk).topleft
+            self.chunks[chunk].blit(image, (pos[0] - chunk_pos[0], pos[1] - chunk_pos[1]))
 
-   def process_data(self, data, tile_list, mob_animations, item_images):
-      #iterate through each value of data file
-      for y , row in enumerate(data):
-         for x , tile in enumerate(row):
-            image = tile_list[tile]        #get the tile from set which corresponds to given data
-            image_rect = image.get_rect()
-            image_x = x * cons.TILE_SIZE
-            image_y = y * cons.TILE_SIZE
-            image_rect.center = (image_x,image_y)
-            tile_data = [image, image_rect, image_x, image_y]
-
-            #perform actions based on the tile
-            if tile == 7:
-               #wall tile
-               self.obstacle_tiles.append(tile_data)
-            elif tile == 8:
-               #ladder tile
-               self.exit_tile = tile_data
-            elif tile == 9 or tile == 10:
-               #coin or potion
-               item = Item(image_x, image_y, (tile-9), item_images[tile-9])
-               self.item_list.append(item)
-               tile_data[0] = tile_list[0]
-            elif tile == 11:
-               #player character
-               player = Character(image_x, image_y, 100, mob_animations, 0, False, 1)
-               self.player = player
-               tile_data[0] = tile_list[0]
-            elif tile >= 12 and tile<=16:
-               #basic enemies
-               enemy_health = [100,50,125,175,75]
-               enemy = Character(image_x, image_y, enemy_health[tile-12], mob_animations, tile - 11, False, 1)
-               self.character_list.append(enemy)
-               tile_data[0] = tile_list[0]
-            elif tile == 17:
-               #boss enemy
-               boss_enemy = Character(image_x, image_y, 400, mob_animations, 6, True, 2)
-               self.character_list.append(boss_enemy)
-               tile_data[0] = tile_list[0]
-               
-            #add image data to main tile list
-            if tile >= 0:
-               self.map_tiles.append(tile_data)
-
-   def update(self,screen_scroll):
-      for tile in self.map_tiles:
-         tile[2] += screen_scroll[0]   #x_co-ordinate
-         tile[3] += screen_scroll[1]   #y_co-ordinate
-         tile[1].center = (tile[2],tile[3])
-
-   def draw(self, surface):
-      for tile in self.map_tiles:
-         tile_image = tile[0]
-         tile_rect = tile[1]
-         surface.blit(tile_image, tile_rect) #tile 0 = image , tile 1 = image rect(position)
\ No newline at end of file
+   def draw(self, surface, camera):
+      #only blit the chunks that touch the screen
+      chunk_px = cons.CHUNK_SIZE * cons.TILE_SIZE
+      view = camera.rect.move(cons.TILE_SIZE // 2, cons.TILE_SIZE // 2)
+      chunks_drawn = 0
+      for chunk_y in range(view.top // chunk_px, (view.bottom - 1) // chunk_px + 1):
+         for chunk_x in range(view.left // chunk_px, (view.right - 1) // chunk_px + 1):
+            chunk_surface = self.chunk((chunk_x, chunk_y))
+            if chunk_surface != None:
+               camera.blit(surface, chunk_surface, chunk_rect((chunk_x, chunk_y)).topleft)
+               chunks_drawn += 1
+      #every other chunk was culled without being looked at
+      camera.culled += len(self.chunk_coords.union(self.chunks)) - chunks_drawn
\ No newline at end of file
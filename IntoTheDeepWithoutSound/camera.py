@@ -0,0 +1,79 @@
+import pygame
+import constants as cons
+
+#Class that holds the world-space position of the screen
+class Camera():
+    def __init__(self):
+        self.offset_x = 0
+        self.offset_y = 0
+        self.scroll = [0, 0]    #how far the camera moved on the last follow
+        self.drawn = 0          #draws made this frame
+        self.culled = 0         #draws skipped this frame because they were off-screen
+
+    def reset(self, x = 0, y = 0):
+        self.offset_x = x
+        self.offset_y = y
+        self.scroll = [0, 0]
+
+    @property
+    def rect(self):
+        #the part of the world that is currently visible
+        return pygame.Rect(self.offset_x, self.offset_y, cons.SCREEN_WIDTH, cons.SCREEN_HEIGHT)
+
+    def follow(self, target_rect):
+        old_x = self.offset_x
+        old_y = self.offset_y
+        screen_left = target_rect.left - self.offset_x
+        screen_right = target_rect.right - self.offset_x
+        screen_top = target_rect.top - self.offset_y
+        screen_bottom = target_rect.bottom - self.offset_y
+
+        #move camera left or right based on target position
+        if screen_right > (cons.SCREEN_WIDTH - cons.SCREEN_THRESHOLD):
+            #move camera right
+            self.offset_x += screen_right - (cons.SCREEN_WIDTH - cons.SCREEN_THRESHOLD)
+        if screen_left < cons.SCREEN_THRESHOLD:
+            #move camera left
+            self.offset_x -= cons.SCREEN_THRESHOLD - screen_left
+
+        #move the camera up or down based on target position
+        if screen_bottom > (cons.SCREEN_HEIGHT - cons.SCREEN_THRESHOLD):
+            #move camera down
+            self.offset_y += screen_bottom - (cons.SCREEN_HEIGHT - cons.SCREEN_THRESHOLD)
+        if screen_top < cons.SCREEN_THRESHOLD:
+            #move camera up
+            self.offset_y -= cons.SCREEN_THRESHOLD - screen_top
+
+        self.scroll = [old_x - self.offset_x, old_y - self.offset_y]
+        return self.scroll
+
+    def apply_pos(self, x, y):
+        return (x - self.offset_x, y - self.offset_y)
+
+    def to_world(self, pos):
+        #screen-space position (e.g. the mouse) -> world-space position
+        return (pos[0] + self.offset_x, pos[1] + self.offset_y)
+
+    def begin_frame(self):
+        #reset the culling stats at the start of the draw pass
+        self.drawn = 0
+        self.culled = 0
+
+    def visible(self, pos, size):
+        #check whether an image of the given size at a world-space top left would be on the screen
+        x = pos[0] - self.offset_x
+        y = pos[1] - self.offset_y
+        if x >= cons.SCREEN_WIDTH or y >= cons.SCREEN_HEIGHT or x + size[0] <= 0 or y + size[1] <= 0:
+            self.culled += 1
+            return False
+        self.drawn += 1
+        return True
+
+    def blit(self, surface, image, pos):
+        #blit an image at a world-space top left, skipping it if it is off-screen
+        if self.visible(pos, image.get_size()):
+            surface.blit(image, (pos[0] - self.offset_x, pos[1] - self.offset_y))
+
+    def draw_group(self, surface, group):
+        for sprite in group:
+            self.blit(surface, sprite.image, sprite.rect.topleft)
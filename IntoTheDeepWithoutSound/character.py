@@ -1,6 +1,7 @@
 import pygame
 import constants as cons
 import weapon
+import grid
 import math
 import random
 
@@ -20,6 +21,8 @@ class Character():
         self.attacked = False
         self.last_attack = pygame.time.get_ticks() # This functions is used to get the no. of ticks that have passed since last update
         self.stunned = False
+        self.sight_cells = None     #(own cell, player cell) the line of sight was last cast for
+        self.can_see_player = False
 
         self.death_counter = 0
         self.death_update_time = pygame.time.get_ticks() # This functions is used to get the no. of ticks that have passed since last update
@@ -31,12 +34,11 @@ class Character():
         self.update_time = pygame.time.get_ticks()  # This functions is used to get the no. of ticks that have passed since last update
         self.isRunning = False
         
-        self.image = self.animationList[self.action_type][self.frame_index]
+        self.image = self.animationList[self.action_type][self.frame_index][self.flipper]
         self.rect = pygame.rect.Rect(0, 0, cons.TILE_SIZE * size - 4, cons.TILE_SIZE * size - 4) 
         self.rect.center = (x,y)
         
-    def move(self, dx, dy, obstacles_tiles, exit_tile = None, interact_check = None):
-        screen_scroll = [0, 0]
+    def move(self, dx, dy, wall_grid, exit_rect = None, interact_check = None):
         level_complete = False
 
         #Check to see if moving left or right
@@ -58,77 +60,49 @@ class Character():
             dy = dy * (math.sqrt(2)/2)
         
         self.rect.x += dx
-        for obstacle in obstacles_tiles:
+        for obstacle in wall_grid.query(self.rect):
             #check for collisions on the x axis
-            if obstacle[1].colliderect(self.rect):
+            if obstacle.colliderect(self.rect):
                 #check for direction
                 if dx > 0:  #collision when moving right
-                    self.rect.right = obstacle[1].left
+                    self.rect.right = obstacle.left
                 if dx < 0:  #collision when moving left
-                    self.rect.left = obstacle[1].right
+                    self.rect.left = obstacle.right
         
         self.rect.y += dy
-        for obstacle in obstacles_tiles:
+        for obstacle in wall_grid.query(self.rect):
             #check for collisions on the y axis
-            if obstacle[1].colliderect(self.rect):
+            if obstacle.colliderect(self.rect):
                 #check for direction
                 if dy > 0:  #collision when moving down
-                    self.rect.bottom = obstacle[1].top
+                    self.rect.bottom = obstacle.top
                 if dy < 0:  #collision when moving up
-                    self.rect.top = obstacle[1].bottom
+                    self.rect.top = obstacle.bottom
 
         #(Logic only applicable to player character)
         if self.char_type == 0:
             #check collision with exit tile
-            if self.rect.collidepoint(exit_tile[1].centerx,exit_tile[1].centery) and interact_check == True:
+            if self.rect.collidepoint(exit_rect.centerx,exit_rect.centery) and interact_check == True:
                 level_complete = True
 
-            #SCROLL CAMERA
-            #move camera left or right based on player position
-            if self.rect.right > (cons.SCREEN_WIDTH - cons.SCREEN_THRESHOLD):
-                #move camera right
-                screen_scroll[0] =  (cons.SCREEN_WIDTH - cons.SCREEN_THRESHOLD) - self.rect.right
-                self.rect.right = (cons.SCREEN_WIDTH - cons.SCREEN_THRESHOLD)
-            if self.rect.left < (cons.SCREEN_THRESHOLD):
-                #move camera left
-                screen_scroll[0] = (cons.SCREEN_THRESHOLD) - self.rect.left
-                self.rect.left = (cons.SCREEN_THRESHOLD)
-
-            #move the camera up or down based on player position
-            if self.rect.bottom > (cons.SCREEN_HEIGHT - cons.SCREEN_THRESHOLD):
-                #move camera down
-                screen_scroll[1] = (cons.SCREEN_HEIGHT - cons.SCREEN_THRESHOLD) - self.rect.bottom
-                self.rect.bottom = (cons.SCREEN_HEIGHT - cons.SCREEN_THRESHOLD)
-            if self.rect.top < (cons.SCREEN_THRESHOLD):
-                #move camera up
-                screen_scroll[1] = (cons.SCREEN_THRESHOLD) - self.rect.top
-                self.rect.top = cons.SCREEN_THRESHOLD
-
-
-        return screen_scroll, level_complete
-
-    def ai(self, player, obstacle_tiles, screen_scroll, fireball_image):
+        return level_complete
+
+    def ai(self, player, wall_grid, flow_field, fireball_image):
         ai_dx = 0
         ai_dy = 0
-        clipped_line = ()
-        stun_cooldown = 70
         fireball = None
 
-        #reposition the enemy based on screen scroll
-        self.rect.x += screen_scroll[0]
-        self.rect.y += screen_scroll[1]
-
         #check if the enemy is alive
         if self.alive == False:
             return 
 
-        #create a line of sight from enemy to player
-        line_of_sight = ((self.rect.centerx, self.rect.centery), (player.rect.centerx, player.rect.centery))
-
         #check if there is a wall between the enemy and the player (Can the enemy see the player)
-        for obstacle in obstacle_tiles:
-            if obstacle[1].clipline(line_of_sight):
-                clipped_line = obstacle[1].clipline(line_of_sight)
+        #the ray is only re-cast when the enemy or the player moves into a different cell
+        sight_cells = (grid.to_cell(self.rect.centerx, self.rect.centery), grid.to_cell(player.rect.centerx, player.rect.centery))
+        if sight_cells != self.sight_cells:
+            self.sight_cells = sight_cells
+            self.can_see_player = wall_grid.line_of_sight(self.rect.center, player.rect.center)
+        clipped_line = not self.can_see_player
 
         #check distance to player
         dist = math.sqrt(((self.rect.centerx - player.rect.centerx) ** 2) + ((self.rect.centery - player.rect.centery) ** 2))
@@ -142,10 +116,18 @@ class Character():
                 ai_dy = cons.enemy_speed
             if player.rect.centery < self.rect.centery:
                 ai_dy = cons.enemy_speed * -1
+        elif clipped_line:
+            #the player is behind a wall so follow the shared flow field around it
+            next_cell = flow_field.next_cell(sight_cells[0])
+            if next_cell != None:
+                target_x = next_cell[0] * cons.TILE_SIZE
+                target_y = next_cell[1] * cons.TILE_SIZE
+                ai_dx = max(-cons.enemy_speed, min(cons.enemy_speed, target_x - self.rect.centerx))
+                ai_dy = max(-cons.enemy_speed, min(cons.enemy_speed, target_y - self.rect.centery))
 
         if not self.stunned:
             #move towards player
-            self.move(ai_dx,ai_dy, obstacle_tiles)
+            self.move(ai_dx,ai_dy, wall_grid)
             #attack the player if (in range, not behind a wall, attack_cooldown, and player hit cooldown)
             if dist < cons.ATTACK_RANGE and self.attacked == False and player.hit == False and not clipped_line:
                 player.health -= self.attack_damage + random.randint(-1,1)
@@ -154,10 +136,9 @@ class Character():
                 self.attacked = True
                 self.last_attack = pygame.time.get_ticks()
             #make boss enemy shoot fireballs
-            fireball_cooldown = 1250
             if self.boss:
-                if dist < 500 and dist > 50 and (pygame.time.get_ticks() - self.last_attack > fireball_cooldown) and not clipped_line: 
-                    fireball = weapon.Fireball(fireball_image, self.rect.centerx, self.rect.centery, player)
+                if dist < cons.fireball_range and dist > cons.fireball_min_range and (pygame.time.get_ticks() - self.last_attack > cons.fireball_cooldown) and not clipped_line: 
+                    fireball = weapon.fireball_pool.get(fireball_image, self.rect.centerx, self.rect.centery, player)
                     self.last_attack = pygame.time.get_ticks()
 
         
@@ -170,7 +151,7 @@ class Character():
             self.update_action(0)
         
         #check if stun-timer is complete
-        if (pygame.time.get_ticks() - self.last_hit > stun_cooldown):
+        if (pygame.time.get_ticks() - self.last_hit > cons.stun_cooldown):
             self.stunned = False
 
         #check for enemy attack cooldown
@@ -182,7 +163,7 @@ class Character():
     def death_flash(self):
         update_cooldown = 60
         #no bar if died a long time ago
-        if self.death_counter >= 15:
+        if self.death_counter >= cons.death_flashes:
             return 1
         #check if enough time has passed since last update
         if pygame.time.get_ticks() - self.death_update_time > update_cooldown:
@@ -190,6 +171,10 @@ class Character():
             self.death_update_time = pygame.time.get_ticks()
         return self.death_counter
 
+    def finished_dying(self):
+        #the death flash is over, so all that is left is the body
+        return self.alive == False and self.death_counter >= cons.death_flashes
+
     def update_sprite(self):
         #check if the character has died
         if self.health <= 0 or self.alive == False: #pause animation if dead
@@ -212,7 +197,8 @@ class Character():
             #idle
 
         update_cooldown = 80
-        self.image = self.animationList[self.action_type][self.frame_index]
+        #frames come pre-flipped, indexed by whether the character faces left
+        self.image = self.animationList[self.action_type][self.frame_index][self.flipper]
 
         #check if enough time has passed since last update
         if pygame.time.get_ticks() - self.update_time > update_cooldown:
@@ -230,9 +216,12 @@ class Character():
             self.frame_index = 0
             self.update_time = pygame.time.get_ticks()
 
-    def draw(self,surface):
-        flipped_image = pygame.transform.flip(self.image, self.flipper, False)
+    def draw(self, surface, camera):
         if self.char_type == 0:
-            surface.blit(flipped_image, (self.rect.x,self.rect.y - cons.global_scale * cons.OFFSET))
+            pos = (self.rect.x, self.rect.y - cons.global_scale * cons.OFFSET)
         else:
-            surface.blit(flipped_image, self.rect) 
\ No newline at end of file
+            pos = self.rect.topleft
+        #skip the blit when off-screen
+        if not camera.visible(pos, self.image.get_size()):
+            return
+        surface.blit(self.image, camera.apply_pos(pos[0], pos[1])) 
\ No newline at end of file
@@ -24,6 +24,10 @@ potion_scale = 2.5
 fireball_scale = 1 
 button_scale = 1
 
+SHOW_DRAW_STATS = False     #show the per-frame draw/cull counts
+STRICT_ASSETS = False       #stop with an error as soon as an asset file can't be found
+DIRTY_RECTS = True          #only send the parts of the screen that changed to the display
+
 OFFSET = 12
 SCREEN_THRESHOLD = 200
 HEALTH_BAR_TYPES = 13
@@ -32,15 +36,43 @@ TILE_SIZE = 16 * global_scale
 TILE_TYPES = 18
 ROWS = 150
 COLS = 150
+#tiles per side of a pre-rendered map chunk. The maps are sparse, so smaller chunks skip more empty space: on level 1
+#(632 tiles) 16 takes 16 chunks of 2.3MB each (36MB), 8 takes 34 of 0.6MB (19MB), 4 takes 85 (12MB). Drawing a
+#screen's worth costs 0.45, 0.5 and 0.6ms, and a corpse decal copies up to 4 chunks, so 8 is the middle ground
+CHUNK_SIZE = 8
+CHUNK_BAKES_PER_FRAME = 1     #map chunks baked each frame of the level intro
+LEVEL_CACHE_SIZE = 3    #parsed levels kept in memory for restarts
+SURFACE_CACHE_DIR = "cache/surfaces"     #where scaled images are stored between launches
+ATLAS_SIZE = 1024       #width and height of each sprite atlas page
+ROTATION_STEP = 2       #degrees between the cached rotations of weapon sprites
+ROTATION_CACHE_SIZE = 720   #rotated sprites kept (enough for every step of the bow, arrow and fireball)
+TEXT_CACHE_SIZE = 64    #rendered strings kept
+ARROW_POOL_SIZE = 32        #most arrows that can be in flight (or stuck in walls) at once
+FIREBALL_POOL_SIZE = 64
+DAMAGE_TEXT_POOL_SIZE = 32
 
 player_speed = 4
 arrow_speed = 12
 enemy_speed = 3
 fireball_speed = 6
+arrow_stuck_frames = 120    #frames an arrow stays stuck in a wall before it goes
+fireball_stuck_frames = 500
 
 RANGE = 40
+CHASE_RANGE = 15    #how many tiles away enemies will path around walls to reach the player
+ENEMY_STORE = True  #update all enemies' AI together in arrays instead of one at a time
+#move and hit test projectiles together in arrays once this many are in flight, which is where the arrays start to
+#pay off (measured against 10 enemies). The levels so far only see 5-8 arrows or fireballs at once, and arrows can't
+#get past ARROW_POOL_SIZE, so this is for busier levels to come and everything is updated one at a time for now
+ARROW_BATCH_SIZE = 80
+FIREBALL_BATCH_SIZE = 48
 ATTACK_RANGE = 60
 
 enemy_damage = [8,6,8,12,4,15]
 enemy_health = [75,50,80,100,60]
-enemy_attack_cooldown = [600,500,600,850,400,800]
\ No newline at end of file
+enemy_attack_cooldown = [600,500,600,850,400,800]
+stun_cooldown = 70          #ms an enemy stays stunned after it is hit (bosses are never stunned)
+fireball_cooldown = 1250    #ms between a boss's fireballs
+fireball_range = 500        #bosses shoot at a player they can see closer than this
+fireball_min_range = 50     #but not closer than this
+death_flashes = 15      #health bar flashes after an enemy dies, before it is left on the map as a corpse
\ No newline at end of file
@@ -0,0 +1,133 @@
+import mmap
+import struct
+import sys
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import constants as cons
+
+#Compiled level file layout: header followed by the raw little-endian int16 tile grid, [row][column]
+MAGIC = b"ITDL"
+VERSION = 2
+FLAG_ZLIB = 1       #tile grid is zlib compressed
+HEADER = struct.Struct("<4sBBHHI")  #magic, version, flags, rows, columns, checksum of the csv it was compiled from
+
+#Function to read a level editor csv file into a grid of tile types
+def read_csv(path):
+    #start with an empty world so that smaller level files still fill the grid
+    world_data = np.full((cons.ROWS, cons.COLS), -1, dtype=np.int16)
+    level_data = np.loadtxt(path, delimiter=",", dtype=np.int16, ndmin=2)
+    world_data[:level_data.shape[0], :level_data.shape[1]] = level_data
+    return world_data
+
+#Function to read a compiled level file
+def read_binary(path):
+    with open(path, "rb") as level_file:
+        with mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, flags, rows, cols, checksum = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} level file")
+            if flags & FLAG_ZLIB:
+                tiles = np.frombuffer(bytearray(zlib.decompress(data[HEADER.size:])), dtype="<i2")
+            else:
+                #copy so the file can be closed (and rewritten) while the level is being played
+                tiles = np.frombuffer(data, dtype="<i2", count=rows * cols, offset=HEADER.size).copy()
+    return tiles.reshape(rows, cols).astype(np.int16, copy=False)
+
+#Function to write a compiled level file
+def write_binary(path, world_data, compress=True, checksum=0):
+    world_data = np.asarray(world_data, dtype="<i2")
+    rows, cols = world_data.shape
+    tiles = world_data.tobytes()
+    flags = 0
+    if compress:
+        tiles = zlib.compress(tiles, 9)
+        flags |= FLAG_ZLIB
+    with open(path, "wb") as level_file:
+        level_file.write(HEADER.pack(MAGIC, VERSION, flags, rows, cols, checksum))
+        level_file.write(tiles)
+
+#Function to checksum a level editor csv file, so a compiled level can tell whether it was made from it
+#(modification times can't be trusted, a checkout or a copy sets them in any order)
+def source_checksum(csv_path):
+    with open(csv_path, "rb") as csv_file:
+        return zlib.crc32(csv_file.read())
+
+#Function to read the checksum of the csv a compiled level file was made from (None if it isn't a current level file)
+def compiled_from(path):
+    with open(path, "rb") as level_file:
+        header = level_file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    magic, version, flags, rows, cols, checksum = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return checksum
+
+#Function to load a level, preferring the compiled file unless it was made from a different version of the csv
+def load(csv_path, binary_path):
+    if binary_path != None and (csv_path == None or compiled_from(binary_path) == source_checksum(csv_path)):
+        return read_binary(binary_path)
+    return read_csv(csv_path)
+
+#Function to compile a level editor csv file into a level file next to it
+def convert(csv_path, compress=True):
+    binary_path = Path(csv_path).with_suffix(".lvl")
+    write_binary(binary_path, read_csv(csv_path), compress, source_checksum(csv_path))
+    return binary_path
+
+#Class that keeps the most recently used level templates in memory so restarts never touch the disk
+class LevelCache():
+    def __init__(self, build_template, capacity = cons.LEVEL_CACHE_SIZE):
+        self.build_template = build_template    #function that loads a level number into a template
+        self.capacity = capacity
+        self.templates = OrderedDict()          #level number -> template, least recently used first
+        self.loading = {}                       #level number -> template being built on the worker thread
+        self.worker = ThreadPoolExecutor(max_workers=1)
+
+    def prefetch(self, level):
+        #start building a level in the background so it is ready by the time it is needed
+        if level in self.templates or level in self.loading:
+            return
+        #only the latest level asked for is worth building, an earlier guess that was never used is dropped
+        for loading in self.loading.values():
+            loading.cancel()
+        loading = self.worker.submit(self.build_template, level)
+        self.loading = {level: loading}
+        loading.add_done_callback(lambda loading: self.drop_failed(level, loading))
+
+    def drop_failed(self, level, loading):
+        #forget a level that couldn't be built (e.g. the one after the last level), get() will raise the error again
+        #if the level is ever asked for (runs on the worker thread, so only ever pops from the dict it was added to)
+        loading_levels = self.loading
+        if not loading.cancelled() and loading.exception() != None and loading_levels.get(level) is loading:
+            loading_levels.pop(level, None)
+
+    def get(self, level):
+        template = self.templates.get(level)
+        if template == None:
+            loading = self.loading.pop(level, None)
+            if loading != None:
+                #only waits if the background build hasn't finished yet
+                template = loading.result()
+            else:
+                template = self.build_template(level)
+            self.templates[level] = template
+            #evict the least recently used level
+            if len(self.templates) > self.capacity:
+                self.templates.popitem(last=False)
+        else:
+            self.templates.move_to_end(level)
+        return template
+
+#Compile levels: python level_data.py [--raw] [levelN_data.csv ...] (defaults to every csv in levels/)
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    compress = "--raw" not in args
+    csv_paths = [arg for arg in args if arg != "--raw"]
+    if not csv_paths:
+        csv_paths = sorted((Path(__file__).parent / "levels").glob("*.csv"))
+    for csv_path in csv_paths:
+        print(f"{csv_path} -> {convert(csv_path, compress)}")
@@ -0,0 +1,28 @@
+#Class that recycles sprites instead of creating new ones, with a hard limit on how many there can be
+#(a sprite counts as free again once it is in no group, so add whatever get() returns to a group straight away)
+class SpritePool():
+    def __init__(self, sprite_class, capacity):
+        self.sprite_class = sprite_class    #needs a reset() taking the same arguments as __init__
+        self.capacity = capacity
+        self.sprites = []                   #every sprite made so far
+        self.high_water_mark = 0            #most sprites in use at once
+
+    def get(self, *args):
+        #returns None if every sprite is already in use
+        in_use = 0
+        free_sprite = None
+        for sprite in self.sprites:
+            if sprite.alive():
+                in_use += 1
+            elif free_sprite == None:
+                free_sprite = sprite
+
+        if free_sprite != None:
+            free_sprite.reset(*args)
+        elif len(self.sprites) < self.capacity:
+            free_sprite = self.sprite_class(*args)
+            self.sprites.append(free_sprite)
+        else:
+            return None
+        self.high_water_mark = max(self.high_water_mark, in_use + 1)
+        return free_sprite
@@ -0,0 +1,179 @@
+import numpy as np
+
+#pygame rects round half away from zero when a float is added to them
+def to_pixels(values):
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+def carry_over(array, rows, new, values):
+    #rows of sprites that were already stored keep their values, new sprites get the given ones
+    result = np.empty(len(rows), dtype=array.dtype)
+    result[~new] = array[rows[~new]]
+    result[new] = values
+    return result
+
+def sweep_overlaps(boxes, targets):
+    #every (box, target) pair of overlapping rects, each given as rows of (left, top, right, bottom)
+    #sort and sweep on x: with the targets sorted by their left edge, each box only needs to look at the run of
+    #targets whose x range can reach it, and only those candidates get the full overlap test
+    order = np.argsort(targets[:, 0], kind="stable")
+    lefts = targets[order, 0]
+    widest = int((targets[:, 2] - targets[:, 0]).max())
+    first = np.searchsorted(lefts, boxes[:, 0] - widest, side="right")
+    last = np.searchsorted(lefts, boxes[:, 2], side="left")
+    counts = np.maximum(last - first, 0)
+    box_rows = np.repeat(np.arange(len(boxes)), counts)
+    candidates = order[np.arange(counts.sum()) + np.repeat(first - np.cumsum(counts) + counts, counts)]
+    box = boxes[box_rows]
+    target = targets[candidates]
+    overlap = (target[:, 0] < box[:, 2]) & (target[:, 2] > box[:, 0]) & (target[:, 1] < box[:, 3]) & (target[:, 3] > box[:, 1])
+    return box_rows[overlap], candidates[overlap]
+
+#Class that keeps every arrow or every fireball in flight in arrays, so they can all be moved and hit tested at once
+#(the sprites are still pooled and drawn as before, and a handful of them are just updated one at a time, which is
+#quicker than setting up the arrays)
+class ProjectileStore():
+    def __init__(self, stuck_frames, batch_size):
+        self.stuck_frames = stuck_frames    #frames a projectile stays stuck in a wall before it goes
+        self.batch_size = batch_size        #fewest projectiles that are updated in arrays
+        self.sprites = []                   #in the same order as the arrays (the order of their group)
+        self.index = {}                     #sprite -> row in the arrays, for the ones still in flight
+        self.empty_arrays()
+
+    def empty_arrays(self):
+        #top left of each rect, its size and the step taken each frame
+        self.x = np.zeros(0, dtype=np.int64)
+        self.y = np.zeros(0, dtype=np.int64)
+        self.width = np.zeros(0, dtype=np.int64)
+        self.height = np.zeros(0, dtype=np.int64)
+        self.dx = np.zeros(0)
+        self.dy = np.zeros(0)
+        #stuck in a wall, and for how many frames
+        self.stuck = np.zeros(0, dtype=bool)
+        self.counter = np.zeros(0, dtype=np.int64)
+
+    def clear(self):
+        #hand the projectiles back to their sprites and forget them
+        #(e.g. when the level's groups are emptied and the pooled sprites get reused)
+        if len(self.sprites) == 0:
+            return
+        #positions and wall flags are kept up to date on the sprites already, only the counters aren't
+        for sprite, row in self.index.items():
+            sprite.collisionCounter = int(self.counter[row])
+        self.sprites = []
+        self.index = {}
+        self.empty_arrays()
+
+    def sync(self, group):
+        #match the arrays to the sprites in the group (only needed when projectiles were fired or removed)
+        sprites = group.sprites()
+        if sprites == self.sprites:
+            return
+        rows = np.fromiter((self.index.get(sprite, -1) for sprite in sprites), dtype=np.int64, count=len(sprites))
+        new = rows < 0
+        added = [sprite for sprite, is_new in zip(sprites, new) if is_new]
+        self.x = carry_over(self.x, rows, new, [sprite.rect.x for sprite in added])
+        self.y = carry_over(self.y, rows, new, [sprite.rect.y for sprite in added])
+        self.width = carry_over(self.width, rows, new, [sprite.rect.width for sprite in added])
+        self.height = carry_over(self.height, rows, new, [sprite.rect.height for sprite in added])
+        self.dx = carry_over(self.dx, rows, new, [sprite.dx for sprite in added])
+        self.dy = carry_over(self.dy, rows, new, [sprite.dy for sprite in added])
+        self.stuck = carry_over(self.stuck, rows, new, [sprite.collideWall for sprite in added])
+        self.counter = carry_over(self.counter, rows, new, [sprite.collisionCounter for sprite in added])
+        self.sprites = sprites
+        self.index = {sprite: row for row, sprite in enumerate(sprites)}
+
+    def rects(self, rows):
+        #(left, top, right, bottom) of the given rows
+        return np.stack((self.x[rows], self.y[rows], self.x[rows] + self.width[rows], self.y[rows] + self.height[rows]), axis=1)
+
+    def step(self, wall_grid, camera):
+        #move everything not stuck in a wall, returns which rows should be removed and which ones moved
+        expired = self.counter >= self.stuck_frames
+        self.counter[self.stuck] += 1
+        moving = np.flatnonzero(~self.stuck)
+        self.x[moving] = to_pixels(self.x[moving] + self.dx[moving])
+        self.y[moving] = to_pixels(self.y[moving] + self.dy[moving])
+        left, top, right, bottom = self.rects(moving).T
+
+        #stop the ones that flew into a wall
+        hit_wall = wall_grid.overlaps_walls(left, top, right, bottom)
+        self.stuck[moving[hit_wall]] = True
+        for row in moving[hit_wall]:
+            self.sprites[row].collideWall = True
+
+        #delete the ones that have gone off the screen to prevent lag
+        view = camera.rect
+        off_screen = (right < view.left) | (left > view.right) | (bottom < view.top) | (top > view.bottom)
+        expired[moving[off_screen]] = True
+
+        #the sprites are what gets drawn, so give them their new positions
+        for row, x, y in zip(moving.tolist(), self.x[moving].tolist(), self.y[moving].tolist()):
+            self.sprites[row].rect.topleft = (x, y)
+        return expired, moving
+
+    def remove(self, rows):
+        #a removed sprite goes back to its pool, so drop its row here in case it comes back as a new projectile
+        #(the pool can hand it straight back, and the group then puts it where it was, so sync wouldn't notice)
+        if not rows.any():
+            return
+        for row in np.flatnonzero(rows):
+            self.sprites[row].kill()
+        keep = ~rows
+        self.sprites = [sprite for sprite, kept in zip(self.sprites, keep) if kept]
+        self.index = {sprite: row for row, sprite in enumerate(self.sprites)}
+        self.x = self.x[keep]
+        self.y = self.y[keep]
+        self.width = self.width[keep]
+        self.height = self.height[keep]
+        self.dx = self.dx[keep]
+        self.dy = self.dy[keep]
+        self.stuck = self.stuck[keep]
+        self.counter = self.counter[keep]
+
+    def update_arrows(self, arrow_group, enemy_list, wall_grid, camera):
+        #returns (damage, enemy rect) for every enemy hit, in the order the arrows were fired
+        hits = []
+        if len(arrow_group) < self.batch_size:
+            self.clear()
+            for arrow in arrow_group:
+                damage, damage_pos = arrow.update(enemy_list, wall_grid, camera)
+                if damage != 0:
+                    hits.append((damage, damage_pos))
+            return hits
+        self.sync(arrow_group)
+        expired, moving = self.step(wall_grid, camera)
+
+        #each arrow that moved hits the first living enemy (in enemy_list order) it overlaps
+        targets = [enemy for enemy in enemy_list if enemy.alive == True]
+        if len(moving) and targets:
+            target_rects = np.array([enemy.rect for enemy in targets], dtype=np.int64)
+            target_rects[:, 2:] += target_rects[:, :2]
+            arrow_rows, target_rows = sweep_overlaps(self.rects(moving), target_rects)
+            order = np.lexsort((target_rows, arrow_rows))
+            arrow_rows, first = np.unique(arrow_rows[order], return_index=True)
+            for row, target_row in zip(moving[arrow_rows].tolist(), target_rows[order][first].tolist()):
+                enemy = targets[target_row]
+                hits.append((self.sprites[row].hit_enemy(enemy), enemy.rect))
+                expired[row] = True
+        self.remove(expired)
+        return hits
+
+    def update_fireballs(self, fireball_group, player, wall_grid, camera):
+        if len(fireball_group) < self.batch_size:
+            self.clear()
+            for fireball in fireball_group:
+                fireball.update(player, wall_grid, camera)
+            return
+        self.sync(fireball_group)
+
+        #the player is checked before the fireballs move, and only the first fireball on them does damage
+        hit = np.zeros(len(self.sprites), dtype=bool)
+        if player.hit == False:
+            left, top, right, bottom = self.rects(np.arange(len(self.sprites))).T
+            rect = player.rect
+            overlap = np.flatnonzero((left < rect.right) & (right > rect.left) & (top < rect.bottom) & (bottom > rect.top))
+            if len(overlap):
+                self.sprites[overlap[0]].hit_player(player)
+                hit[overlap[0]] = True
+        expired, moving = self.step(wall_grid, camera)
+        self.remove(expired | hit)
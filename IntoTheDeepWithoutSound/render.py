@@ -0,0 +1,122 @@
+import pygame
+from collections import OrderedDict
+import constants as cons
+
+#draw order of the layers, back to front
+LAYERS = ("tiles", "characters", "projectiles", "items", "ui")
+STATIC_LAYERS = ("tiles",)      #layers that only change when the camera moves
+
+#Class that collects the blits for one layer so they can all be drawn with one call
+#(it has a blit method, so anything that draws onto a surface can draw onto a layer instead)
+class RenderLayer():
+    def __init__(self):
+        self.blit_sequence = []     #(image, screen position) or (image, screen position, area) tuples
+
+    def blit(self, image, pos, area = None):
+        if area == None:
+            self.blit_sequence.append((image, pos))
+        else:
+            self.blit_sequence.append((image, pos, area))
+
+    def flush(self, surface, doreturn = False):
+        #returns the screen areas drawn to if asked for them
+        rects = []
+        if self.blit_sequence:
+            rects = surface.blits(self.blit_sequence, doreturn=doreturn)
+            self.blit_sequence.clear()
+        return rects
+
+#Class that holds a layer for each part of the scene and draws them in order
+class RenderQueue():
+    def __init__(self, layers = LAYERS):
+        self.layers = {name: RenderLayer() for name in layers}
+
+    def layer(self, name):
+        return self.layers[name]
+
+    def flush(self, surface, dirty_rects = None):
+        for name, layer in self.layers.items():
+            #static layers are covered by the camera scrolling, so only the others need reporting
+            if dirty_rects != None and name not in STATIC_LAYERS:
+                dirty_rects.add_all(layer.flush(surface, True))
+            else:
+                layer.flush(surface)
+
+#Class that keeps track of the parts of the screen that changed, so only those are sent to the display
+class DirtyRects():
+    def __init__(self, enabled = cons.DIRTY_RECTS):
+        self.enabled = enabled
+        self.rects = []             #screen areas drawn to this frame
+        self.last_rects = []        #areas drawn to last frame, which show stale pixels if what was there moved
+        self.full = True            #send the whole screen this frame
+        self.view = None            #which screen (menu, pause, ...) was shown last frame
+
+    def set_view(self, view):
+        #switching screens changes everything
+        if view != self.view:
+            self.view = view
+            self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def add(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def add_all(self, rects):
+        self.rects.extend(rects)
+
+    def present(self):
+        if self.full or not self.enabled:
+            pygame.display.update()
+        elif self.rects or self.last_rects:
+            pygame.display.update(self.last_rects + self.rects)
+        self.last_rects = self.rects
+        self.rects = []
+        self.full = False
+
+
+#Class that keeps rendered text so strings that haven't changed aren't rendered and scaled again every frame
+class TextCache():
+    def __init__(self, capacity = cons.TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.images = OrderedDict()     #(text, font, colour, scale) -> image, least recently used first
+
+    def render(self, text, font, color, scale = 1):
+        key = (text, font, tuple(color), scale)
+        image = self.images.get(key)
+        if image == None:
+            image = font.render(text, True, color)
+            if scale != 1:
+                image = pygame.transform.scale(image, (image.get_width() * scale, image.get_height() * scale))
+            self.images[key] = image
+            #evict the least recently used text
+            if len(self.images) > self.capacity:
+                self.images.popitem(last=False)
+        else:
+            self.images.move_to_end(key)
+        return image
+
+#Class that pre-renders the glyphs of a font in a few colours, so short strings (e.g. damage numbers) can be put
+#together from them instead of rasterising the font every time
+class GlyphAtlas():
+    def __init__(self, font, colors, atlas, characters = "0123456789"):
+        self.font = font
+        self.glyphs = {}    #(character, colour) -> glyph image (on the atlas)
+        keys = [(character, tuple(color)) for color in colors for character in characters]
+        glyphs = atlas.pack([(f"glyph:{id(font)}:{character}:{color}", font.render(character, True, color)) for character, color in keys])
+        for key, glyph in zip(keys, glyphs):
+            self.glyphs[key] = glyph
+
+    def render(self, text, color):
+        glyphs = [self.glyphs.get((character, tuple(color))) for character in text]
+        if None in glyphs:
+            #not pre-rendered, so fall back to the font
+            return self.font.render(text, True, color)
+        image = pygame.Surface((sum(glyph.get_width() for glyph in glyphs), max(glyph.get_height() for glyph in glyphs)), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            #the glyphs don't overlap and the image starts transparent, so taking the max copies them exactly
+            image.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += glyph.get_width()
+        return image
\ No newline at end of file
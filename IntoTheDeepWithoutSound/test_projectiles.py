@@ -0,0 +1,129 @@
+import random
+import numpy as np
+import pygame
+import pytest
+import constants as cons
+import weapon
+from grid import WallGrid
+from pool import SpritePool
+from projectiles import ProjectileStore, sweep_overlaps, to_pixels
+
+#run with "python -m pytest" from this folder
+
+#something with a rect for the projectiles to hit (the enemy or the player)
+class Target():
+    def __init__(self, x, y, size):
+        self.rect = pygame.Rect(x, y, size, size)
+        self.alive = True
+        self.hit = False
+        self.health = 1000
+        self.last_hit = 0
+
+#only the area projectiles are kept in
+class View():
+    def __init__(self, rect):
+        self.rect = rect
+
+def random_rects(count, size, max_size):
+    rects = []
+    for i in range(count):
+        rects.append(pygame.Rect(random.randint(-100, size), random.randint(-100, size), random.randint(1, max_size), random.randint(1, max_size)))
+    return rects
+
+def edges(rects):
+    #(left, top, right, bottom) rows
+    return np.array([(rect.left, rect.top, rect.right, rect.bottom) for rect in rects], dtype=np.int64).reshape(-1, 4)
+
+def test_sweep_overlaps_matches_brute_force():
+    random.seed(1)
+    for count, targets in ((0, 5), (1, 1), (50, 20), (400, 150)):
+        boxes = random_rects(count, 1500, 40)
+        target_rects = random_rects(targets, 1500, 160)
+        box_rows, target_rows = sweep_overlaps(edges(boxes), edges(target_rects))
+        found = set(zip(box_rows.tolist(), target_rows.tolist()))
+        expected = {(i, j) for i, box in enumerate(boxes) for j, target in enumerate(target_rects) if box.colliderect(target)}
+        assert found == expected
+
+def test_to_pixels_matches_rect():
+    #including the half pixel steps, which rects round away from zero
+    steps = [0.5, -0.5, 1.5, -1.5, 2.5, -2.5] + [random.uniform(-12, 12) for i in range(200)]
+    for x in (-7, -1, 0, 3, 250):
+        for step in steps:
+            rect = pygame.Rect(x, 0, 1, 1)
+            rect.x += step
+            assert to_pixels(np.array([x + step]))[0] == rect.x
+
+def test_overlaps_walls_matches_query():
+    random.seed(2)
+    wall_grid = WallGrid(np.random.default_rng(2).random((30, 40)) < 0.3)
+    rects = random_rects(2000, 40 * cons.TILE_SIZE, 3 * cons.TILE_SIZE)
+    hit = wall_grid.overlaps_walls(*edges(rects).T)
+    expected = [any(wall.colliderect(rect) for wall in wall_grid.query(rect)) for rect in rects]
+    assert hit.tolist() == expected
+
+def make_projectiles(seed):
+    random.seed(seed)
+    image = pygame.Surface((7, 21), pygame.SRCALPHA)
+    size = 40 * cons.TILE_SIZE
+    player = Target(size // 2, size // 2, 40)
+    #enemies in clumps, so arrows often overlap several at once and must hit the first in the list
+    clumps = [(random.randint(0, size), random.randint(0, size)) for i in range(10)]
+    enemies = [Target(x + random.randint(-30, 30), y + random.randint(-30, 30), 2 * cons.TILE_SIZE) for x, y in clumps for i in range(4)]
+    arrows = pygame.sprite.Group([weapon.Arrow(image, random.randint(0, size), random.randint(0, size), random.uniform(0, 360)) for i in range(120)])
+    fireballs = pygame.sprite.Group([weapon.Fireball(image, random.randint(0, size), random.randint(0, size), player) for i in range(120)])
+    return arrows, fireballs, enemies, player
+
+def state(arrows, fireballs, enemies, player):
+    return ([(arrow.rect.topleft, arrow.collideWall) for arrow in arrows], [(fireball.rect.topleft, fireball.collideWall) for fireball in fireballs],
+            [(enemy.health, enemy.hit) for enemy in enemies], player.health)
+
+#with batch sizes of 0 everything is updated in arrays, with the others the store switches between arrays and one at a
+#time as projectiles come and go (the pool keeps about ARROW_POOL_SIZE arrows around towards the end)
+@pytest.mark.parametrize("arrow_batch_size, fireball_batch_size", [(0, 0), (cons.ARROW_POOL_SIZE, 110)])
+def test_store_matches_sprite_updates(arrow_batch_size, fireball_batch_size):
+    #the same projectiles updated one at a time and in arrays must stay identical every frame
+    wall_grid = WallGrid(np.random.default_rng(3).random((40, 40)) < 0.05)
+    view = View(pygame.Rect(-200, -200, 40 * cons.TILE_SIZE + 400, 40 * cons.TILE_SIZE + 400))
+    one_at_a_time = make_projectiles(4)
+    batched = make_projectiles(4)
+    arrow_store = ProjectileStore(cons.arrow_stuck_frames, arrow_batch_size)
+    fireball_store = ProjectileStore(cons.fireball_stuck_frames, fireball_batch_size)
+    arrow_counts = []
+    #new arrows are fired through the game's pool, some of them off the screen, so a sprite the store has just
+    #removed comes straight back as a new arrow
+    image = pygame.Surface((7, 21), pygame.SRCALPHA)
+    pools = (SpritePool(weapon.Arrow, cons.ARROW_POOL_SIZE), weapon.arrow_pool)
+    size = 40 * cons.TILE_SIZE
+    for frame in range(400):
+        random.seed(-frame)
+        x, y, angle = random.randint(-400, size + 400), random.randint(-400, size + 400), random.uniform(0, 360)
+        for (arrows, fireballs, enemies, player), pool in zip((one_at_a_time, batched), pools):
+            arrow = pool.get(image, x, y, angle)
+            if arrow != None:
+                arrows.add(arrow)
+
+        arrows, fireballs, enemies, player = one_at_a_time
+        random.seed(frame)
+        expected_hits = []
+        for arrow in arrows:
+            damage, damage_pos = arrow.update(enemies, wall_grid, view)
+            if damage != 0:
+                expected_hits.append((damage, damage_pos))
+        for fireball in fireballs:
+            fireball.update(player, wall_grid, view)
+
+        arrows, fireballs, enemies, player = batched
+        arrow_counts.append(len(arrows))
+        random.seed(frame)
+        hits = arrow_store.update_arrows(arrows, enemies, wall_grid, view)
+        fireball_store.update_fireballs(fireballs, player, wall_grid, view)
+
+        assert hits == expected_hits
+        assert state(*batched) == state(*one_at_a_time)
+        if frame % 7 == 0:
+            one_at_a_time[3].hit = batched[3].hit = False
+    assert len(one_at_a_time[0]) < 120
+    if arrow_batch_size > 0:
+        assert min(arrow_counts[200:]) < arrow_batch_size <= max(arrow_counts[200:])
+    #hand the pool's arrows back for the next run
+    batched[0].empty()
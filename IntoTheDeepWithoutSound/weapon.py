@@ -1,32 +1,62 @@
 import pygame
 import math
 import random
+from collections import OrderedDict
 import constants as cons
+from pool import SpritePool
+
+#Class that keeps rotated copies of images, with the angle rounded to a fixed step, so rotating is a lookup
+class RotationCache():
+    def __init__(self, step = cons.ROTATION_STEP, capacity = cons.ROTATION_CACHE_SIZE):
+        self.step = step
+        self.steps = round(360 / step)     #rotations per image
+        self.capacity = capacity
+        self.images = OrderedDict()         #(image, step number) -> rotated image, least recently used first
+
+    def rotate(self, image, angle):
+        step = round(angle / self.step) % self.steps
+        key = (image, step)
+        rotated = self.images.get(key)
+        if rotated == None:
+            rotated = pygame.transform.rotate(image, step * self.step)
+            self.images[key] = rotated
+            #evict the least recently used rotation
+            if len(self.images) > self.capacity:
+                self.images.popitem(last=False)
+        else:
+            self.images.move_to_end(key)
+        return rotated
+
+    def prerender(self, image):
+        for step in range(self.steps):
+            self.rotate(image, step * self.step)
+
+rotation_cache = RotationCache()
 
 class Weapon():
     def __init__(self, image, arrow_image):
         self.orignal_image = image
         self.angle = 0
-        self.image = pygame.transform.rotate(self.orignal_image,self.angle)
+        self.image = rotation_cache.rotate(self.orignal_image,self.angle)
         self.rect = self.image.get_rect()
         self.arrow_image = arrow_image
         self.fired = False      #Mouse Trigger for arrow(One per click)
         self.last_shot = pygame.time.get_ticks()
 
-    def update_weapon(self,player):
+    def update_weapon(self, player, camera):
         arrow = None
         self.rect.center = player.rect.center
         shot_cooldown = 450
 
-        #get mouse position
-        mouse_pos = pygame.mouse.get_pos()
+        #get mouse position (in world co-ords)
+        mouse_pos = camera.to_world(pygame.mouse.get_pos())
         x_dist = (mouse_pos[0] - self.rect.centerx)
         y_dist = (mouse_pos[1] - self.rect.centery)*-1 #Change the sign as y co-ord increases when going down the screen
         self.angle = math.degrees(math.atan2(y_dist,x_dist))
 
         #get mouse_click
         if pygame.mouse.get_pressed()[0] and self.fired == False and (pygame.time.get_ticks() - self.last_shot) > shot_cooldown:
-            arrow = Arrow(self.arrow_image,self.rect.centerx,self.rect.centery,self.angle)
+            arrow = arrow_pool.get(self.arrow_image,self.rect.centerx,self.rect.centery,self.angle)
             self.fired = True
             self.last_shot = pygame.time.get_ticks()
         #get mouse_release
@@ -35,17 +65,21 @@ class Weapon():
         
         return arrow
 
-    def draw(self,surface):
-        self.image = pygame.transform.rotate(self.orignal_image,self.angle)
-        surface.blit(self.image, ((self.rect.centerx - int(self.image.get_width()/2),(self.rect.centery - int(self.image.get_height()/2)))))
+    def draw(self, surface, camera):
+        self.image = rotation_cache.rotate(self.orignal_image,self.angle)
+        camera.blit(surface, self.image, (self.rect.centerx - int(self.image.get_width()/2), self.rect.centery - int(self.image.get_height()/2)))
 
 
 class Arrow(pygame.sprite.Sprite):
     def __init__(self, image, x, y, angle):
         pygame.sprite.Sprite.__init__(self)
+        self.reset(image, x, y, angle)
+
+    def reset(self, image, x, y, angle):
+        #set up a new (or recycled) arrow
         self.orignal_image = image
         self.angle = angle
-        self.image = pygame.transform.rotate(self.orignal_image,self.angle - 90)
+        self.image = rotation_cache.rotate(self.orignal_image,self.angle - 90)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         #Calculation of the speed of arrow depending on the angle
@@ -54,14 +88,12 @@ class Arrow(pygame.sprite.Sprite):
         self.collideWall = False
         self.collisionCounter = 0
 
-    def update(self, screen_scroll, enemy_list, obstacle_tiles):
+    def update(self, enemy_list, wall_grid, camera):
         #default variables
         damage = 0
         damage_pos = None
-        if(self.collisionCounter >= 120):
+        if(self.collisionCounter >= cons.arrow_stuck_frames):
             self.kill()
-        self.rect.x += (screen_scroll[0])
-        self.rect.y += (screen_scroll[1])
         if self.collideWall == True:
             self.collisionCounter += 1
             return damage, damage_pos
@@ -69,42 +101,52 @@ class Arrow(pygame.sprite.Sprite):
         self.rect.x += (self.dx)
         self.rect.y += (self.dy)
         
-        for obstacle in obstacle_tiles:
+        for obstacle in wall_grid.query(self.rect):
             #check for collisions on the y axis
-            if obstacle[1].colliderect(self.rect):
+            if obstacle.colliderect(self.rect):
                 self.collideWall = True
 
         #delete the arrow if it has gone off the screen to prevent lag
-        if self.rect.right < 0 or self.rect.left > cons.SCREEN_WIDTH:   #Width check
+        view = camera.rect
+        if self.rect.right < view.left or self.rect.left > view.right:   #Width check
             self.kill() 
-        if self.rect.bottom < 0 or self.rect.top > cons.SCREEN_HEIGHT:  #Height check
+        if self.rect.bottom < view.top or self.rect.top > view.bottom:  #Height check
             self.kill() 
         
         #check if the arrow has hit an enemy
         for enemy in enemy_list:
             #checks if arrow rectangle has hit an enemy
             if enemy.rect.colliderect(self.rect) and enemy.alive == True: 
-                enemy.hit = True
-                damage = 15 + random.randint(-2, 2)
+                damage = self.hit_enemy(enemy)
                 damage_pos = enemy.rect
-                enemy.health -= damage
-                self.kill()
                 break
         return damage, damage_pos
 
-    def draw(self,surface):
+    def hit_enemy(self, enemy):
+        #damage the enemy and remove the arrow, returns the damage done
+        enemy.hit = True
+        damage = 15 + random.randint(-2, 2)
+        enemy.health -= damage
+        self.kill()
+        return damage
+
+    def draw(self, surface, camera):
         arrow_x = self.rect.centerx - int(self.image.get_width()/2)
         arrow_y = self.rect.centery - int(self.image.get_height()/2)
-        surface.blit(self.image, (arrow_x,arrow_y)) 
+        camera.blit(surface, self.image, (arrow_x,arrow_y)) 
 
 class Fireball(pygame.sprite.Sprite):
     def __init__(self, image, x, y, target):
         pygame.sprite.Sprite.__init__(self)
+        self.reset(image, x, y, target)
+
+    def reset(self, image, x, y, target):
+        #set up a new (or recycled) fireball
         self.orignal_image = image
         x_dist = (target.rect.centerx - x)
         y_dist = (target.rect.centery - y) * -1
         self.angle = math.degrees(math.atan2(y_dist,x_dist))
-        self.image = pygame.transform.rotate(self.orignal_image,self.angle - 90)
+        self.image = rotation_cache.rotate(self.orignal_image,self.angle - 90)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         #Calculation of the speed of arrow depending on the angle
@@ -113,18 +155,13 @@ class Fireball(pygame.sprite.Sprite):
         self.collideWall = False
         self.collisionCounter = 0
 
-    def update(self, screen_scroll, player, obstacle_tiles):
-        self.rect.x += (screen_scroll[0])
-        self.rect.y += (screen_scroll[1])
-        if(self.collisionCounter >= 500):
+    def update(self, player, wall_grid, camera):
+        if(self.collisionCounter >= cons.fireball_stuck_frames):
             self.kill()
         
         #check if the fireball has hit the player
         if player.rect.colliderect(self.rect) and player.hit == False:
-            player.hit = True
-            player.last_hit = True
-            player.health -= 5
-            self.kill()
+            self.hit_player(player)
 
         if self.collideWall == True:
             self.collisionCounter += 1
@@ -134,19 +171,31 @@ class Fireball(pygame.sprite.Sprite):
         self.rect.x += (self.dx)
         self.rect.y += (self.dy)
         
-        for obstacle in obstacle_tiles:
+        for obstacle in wall_grid.query(self.rect):
             #check for collisions on the y axis
-            if obstacle[1].colliderect(self.rect):
+            if obstacle.colliderect(self.rect):
                 self.collideWall = True
 
         #delete the fireball if it has gone off the screen to prevent lag
-        if self.rect.right < 0 or self.rect.left > cons.SCREEN_WIDTH:   #Width check
+        view = camera.rect
+        if self.rect.right < view.left or self.rect.left > view.right:   #Width check
             self.kill() 
-        if self.rect.bottom < 0 or self.rect.top > cons.SCREEN_HEIGHT:  #Height check
+        if self.rect.bottom < view.top or self.rect.top > view.bottom:  #Height check
             self.kill() 
 
 
-    def draw(self,surface):
+    def hit_player(self, player):
+        #damage the player and remove the fireball
+        player.hit = True
+        player.last_hit = True
+        player.health -= 5
+        self.kill()
+
+    def draw(self, surface, camera):
         arrow_x = self.rect.centerx - int(self.image.get_width()/2)
         arrow_y = self.rect.centery - int(self.image.get_height()/2)
-        surface.blit(self.image, (arrow_x,arrow_y))    
\ No newline at end of file
+        camera.blit(surface, self.image, (arrow_x,arrow_y))
+
+#arrows and fireballs are recycled rather than made for every shot
+arrow_pool = SpritePool(Arrow, cons.ARROW_POOL_SIZE)
+fireball_pool = SpritePool(Fireball, cons.FIREBALL_POOL_SIZE)
\ No newline at end of file